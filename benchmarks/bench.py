@@ -0,0 +1,280 @@
+"""HTML: parser BENCHMARKS
+
+Parses the documents of the `corpus` module with the `default` style
+and reports, for each scenario, the throughput in megabytes and nodes
+per second, the throughput of `tokenize` alone, the peak memory of a
+parse and, for each node parser, its share of the time, its
+throughput and how often it succeeds:
+
+    python benchmarks/bench.py
+    python benchmarks/bench.py --size 65536 --scenario page nesting
+
+The time of a scenario is the best of `--repeat` parses. The peak
+memory is measured with `tracemalloc` and the statistics of each node
+parser with the option `instrument` of the style, each in a parse of
+its own so that they do not slow down the timed parses. Python 2 does
+not have `tracemalloc`, the peak memory is then the growth of the
+maximum resident set size of a child process during the parse. It is
+not reported when neither is available. The time of a
+node parser does not include the node parsers it calls and its
+throughput is given in characters consumed per second.
+
+The results may be saved as a baseline and later runs compared
+against it. The comparison fails, and the command exits with status
+1, when the throughput of a scenario drops or its peak memory grows
+by more than `--tolerance`:
+
+    python benchmarks/bench.py --save baseline.json
+    python benchmarks/bench.py --compare baseline.json
+
+"""
+
+import os
+import sys
+import json
+import argparse
+from collections import deque
+from timeit import default_timer
+from lexor.core.parser import Parser
+
+import corpus
+
+try:
+    import tracemalloc
+except ImportError:
+    tracemalloc = None
+try:
+    import resource
+except ImportError:
+    resource = None
+
+MEGABYTE = 1024.0 * 1024.0
+
+# Bytes in the unit of `ru_maxrss`.
+MAXRSS_UNIT = 1 if sys.platform == 'darwin' else 1024
+
+
+def count_nodes(doc):
+    """Return the number of nodes in a document, itself included. """
+    total = 0
+    stack = [doc]
+    while stack:
+        node = stack.pop()
+        total += 1
+        if node.child:
+            stack.extend(node.child)
+    return total
+
+
+def profile(text, defaults=None):
+    """Return a dictionary with the statistics of each node parser,
+    see the `instrument` module of the style, and their throughput
+    in millions of characters per second. """
+    defaults = dict(defaults or ())
+    defaults['instrument'] = 'true'
+    parser = Parser('html', 'default', defaults)
+    parser.parse(text)
+    report = parser.instrumentation.report
+    total = sum(entry['seconds'] for entry in
+                report['node_parsers'].values()) or 1.0
+    result = dict()
+    for name, entry in report['node_parsers'].items():
+        entry = dict(entry)
+        entry['share'] = entry['seconds'] / total
+        entry['mchars_per_s'] = 0.0
+        if entry['seconds']:
+            entry['mchars_per_s'] = entry['chars'] / 1e6 / entry['seconds']
+        result[name] = entry
+    return result
+
+
+def best_time(func, repeat=3):
+    """Return the shortest time out of `repeat` calls to `func`. """
+    best = None
+    for _ in range(repeat):
+        start = default_timer()
+        func()
+        total = default_timer() - start
+        if best is None or total < best:
+            best = total
+    return best
+
+
+def run_scenario(parser, text, repeat=3, node_parsers=True,
+                 defaults=None):
+    """Parse `text` and return a dictionary with the measures. """
+    size = len(text.encode('utf-8'))
+    best = best_time(lambda: parser.parse(text), repeat)
+    tokenize = parser.style_module.tokenize
+    tokens = best_time(lambda: deque(tokenize(text), 0), repeat)
+    nodes = count_nodes(parser.doc)
+    messages = len(parser.log)
+    result = {
+        'bytes': size,
+        'nodes': nodes,
+        'messages': messages,
+        'seconds': best,
+        'mb_per_s': size / MEGABYTE / best,
+        'nodes_per_s': nodes / best,
+        'tokens_mb_per_s': size / MEGABYTE / tokens,
+    }
+    peak = peak_memory(parser, text)
+    if peak is not None:
+        result['peak_mb'] = peak / MEGABYTE
+    if node_parsers:
+        result['node_parsers'] = profile(text, defaults)
+    return result
+
+
+def peak_memory(parser, text):
+    """Return the peak memory in bytes allocated by a parse of `text`
+    or None if it cannot be measured. """
+    if tracemalloc is None:
+        if resource is None or not hasattr(os, 'fork'):
+            return None
+        return child_peak_memory(parser, text)
+    tracemalloc.start()
+    try:
+        parser.parse(text)
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def child_peak_memory(parser, text):
+    """Return the growth in bytes of the maximum resident set size of
+    a child process while it parses `text`. """
+    read, write = os.pipe()
+    pid = os.fork()
+    if pid == 0:
+        status = 1
+        try:
+            os.close(read)
+            before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+            parser.parse(text)
+            after = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+            os.write(write, str(after - before).encode('ascii'))
+            status = 0
+        finally:
+            os._exit(status)
+    os.close(write)
+    try:
+        data = os.read(read, 64)
+    finally:
+        os.close(read)
+        os.waitpid(pid, 0)
+    return int(data) * MAXRSS_UNIT
+
+
+def run(scenarios=None, size=1 << 17, repeat=3, seed=0, defaults=None,
+        node_parsers=True, out=None):
+    """Run the benchmarks of the given scenarios, all by default, and
+    return a dictionary with their results. A line is written to `out`
+    after each scenario. """
+    parser = Parser('html', 'default', defaults)
+    results = dict()
+    for name in scenarios or corpus.SCENARIOS:
+        text = corpus.generate(name, size, seed)
+        results[name] = run_scenario(parser, text, repeat, node_parsers,
+                                     defaults)
+        if out is not None:
+            out.write(format_result(name, results[name]))
+            out.flush()
+    return {
+        'size': size,
+        'seed': seed,
+        'python': sys.version.split()[0],
+        'scenarios': results,
+    }
+
+
+def format_result(name, result):
+    """Return the lines describing the result of a scenario. """
+    peak = '       -'
+    if 'peak_mb' in result:
+        peak = '%8.1f' % result['peak_mb']
+    lines = ['%-12s %8.3f MB/s %10.0f nodes/s %8.3f MB/s tokens '
+             '%s MB peak %6d msgs\n' % (
+                 name, result['mb_per_s'], result['nodes_per_s'],
+                 result['tokens_mb_per_s'], peak, result['messages'],
+             )]
+    node_parsers = result.get('node_parsers', {})
+    for key in sorted(node_parsers, key=lambda x: -node_parsers[x]['share']):
+        entry = node_parsers[key]
+        lines.append('    %-24s %5.1f%% %8.3f Mchar/s %8d/%-8d hits %8d/%-8d '
+                     'closed\n' % (
+                         key, 100 * entry['share'], entry['mchars_per_s'],
+                         entry['hits'], entry['attempts'],
+                         entry['close_hits'], entry['close_attempts'],
+                     ))
+    return ''.join(lines)
+
+
+def compare(results, baseline, tolerance=0.25):
+    """Return a list of strings describing the scenarios in `results`
+    whose throughput is lower or whose peak memory is higher than in
+    `baseline` by more than `tolerance`. """
+    failures = list()
+    old = baseline['scenarios']
+    for name, new in sorted(results['scenarios'].items()):
+        if name not in old:
+            continue
+        for key, worse in (('mb_per_s', -1), ('nodes_per_s', -1),
+                           ('tokens_mb_per_s', -1), ('peak_mb', 1)):
+            if key not in old[name] or key not in new:
+                continue
+            before, after = old[name][key], new[key]
+            if worse * (after - before) > tolerance * before:
+                failures.append('%s: %s went from %.3f to %.3f' % (
+                    name, key, before, after
+                ))
+    return failures
+
+
+def main(argv=None):
+    """Command line interface, returns the exit status. """
+    desc = 'benchmark the html parser of the default style'
+    cli = argparse.ArgumentParser(description=desc)
+    cli.add_argument('--scenario', nargs='+', choices=list(corpus.SCENARIOS),
+                     help='scenarios to run, all by default')
+    cli.add_argument('--size', type=int, default=1 << 17,
+                     help='characters per document (default: %(default)s)')
+    cli.add_argument('--repeat', type=int, default=3,
+                     help='timed parses per scenario (default: %(default)s)')
+    cli.add_argument('--seed', type=int, default=0,
+                     help='seed of the corpus (default: %(default)s)')
+    cli.add_argument('--no-profile', action='store_true',
+                     help='do not measure the node parsers')
+    cli.add_argument('--save', metavar='FILE',
+                     help='write the results to FILE as a baseline')
+    cli.add_argument('--compare', metavar='FILE',
+                     help='compare the results with the baseline in FILE')
+    cli.add_argument('--tolerance', type=float, default=0.25,
+                     help='allowed relative change (default: %(default)s)')
+    args = cli.parse_args(argv)
+    baseline = None
+    if args.compare:
+        with open(args.compare) as handle:
+            baseline = json.load(handle)
+        if (baseline['size'], baseline['seed']) != (args.size, args.seed):
+            sys.stderr.write('the baseline was run with --size %d --seed %d\n'
+                             % (baseline['size'], baseline['seed']))
+            return 2
+    results = run(args.scenario, args.size, args.repeat, args.seed,
+                  node_parsers=not args.no_profile, out=sys.stdout)
+    if args.save:
+        with open(args.save, 'w') as handle:
+            json.dump(results, handle, indent=2, sort_keys=True)
+    if baseline is not None:
+        failures = compare(results, baseline, args.tolerance)
+        if failures:
+            sys.stderr.write('REGRESSIONS against %s:\n' % args.compare)
+            for line in failures:
+                sys.stderr.write('  %s\n' % line)
+            return 1
+        sys.stdout.write('no regressions against %s\n' % args.compare)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,213 @@
+"""HTML: benchmark CORPUS
+
+Generates the documents parsed by the benchmarks. Each scenario is a
+function which receives a `random.Random` object and the number of
+characters wanted and returns a text of at least that length. The
+same seed always gives the same text:
+
+    text = generate('page', 1 << 18)
+
+The scenarios are
+
+    page        realistic pages with a head, navigation, articles,
+                tables, forms and a footer
+    attributes  templates whose elements declare many attributes,
+                quoted, unquoted and repeated
+    script      a single huge inline `<script>`
+    nesting     deep lists, definition lists and tables whose items
+                and cells are closed by `AUTO_CLOSE_FIRST`
+    comments    comments full of `--`
+    entities    urls and text dense with `&`
+    stray       stray end tags and `<` characters which are not tags
+
+"""
+
+import random
+from collections import OrderedDict
+
+WORDS = (
+    'lorem ipsum dolor sit amet consectetur adipiscing elit sed do '
+    'eiusmod tempor incididunt ut labore et dolore magna aliqua ut '
+    'enim ad minim veniam quis nostrud exercitation ullamco laboris'
+).split()
+
+
+def _words(rnd, low, high):
+    """Return a sentence with between `low` and `high` words. """
+    return ' '.join(rnd.choice(WORDS) for _ in range(rnd.randint(low, high)))
+
+
+def _fill(rnd, size, head, make, tail=''):
+    """Return `head` followed by the pieces returned by `make(rnd,
+    num)` until the text has `size` characters, and `tail`. """
+    parts = [head]
+    total = len(head)
+    num = 0
+    while total < size:
+        piece = make(rnd, num)
+        parts.append(piece)
+        total += len(piece)
+        num += 1
+    parts.append(tail)
+    return ''.join(parts)
+
+
+def page(rnd, size):
+    """Realistic pages. """
+    def make(rnd, num):
+        parts = [
+            '<!DOCTYPE html>\n<html lang="en">\n<head>\n'
+            '<meta charset="utf-8">\n'
+            '<meta name="viewport" content="width=device-width">\n'
+            '<title>%s</title>\n'
+            '<link rel="stylesheet" href="/css/site.css?v=%d">\n'
+            '<style>body { margin: 0 } p > a { color: #333 }</style>\n'
+            '</head>\n<body class="page-%d">\n<header><nav><ul>\n'
+            % (_words(rnd, 2, 5), num, num)
+        ]
+        for item in range(rnd.randint(4, 8)):
+            parts.append('  <li><a href="/section/%d">%s</a></li>\n'
+                         % (item, _words(rnd, 1, 2)))
+        parts.append('</ul></nav></header>\n<main>\n')
+        for _ in range(rnd.randint(2, 5)):
+            parts.append('<article id="post-%d">\n<h2>%s</h2>\n'
+                         % (rnd.randint(1, 9999), _words(rnd, 3, 8)))
+            for _ in range(rnd.randint(2, 6)):
+                parts.append(
+                    '<p>%s <b>%s</b> %s <a href="/p/%d" title="%s">%s</a>'
+                    ' &copy; <i>%s</i>.</p>\n' % (
+                        _words(rnd, 8, 30), _words(rnd, 1, 3),
+                        _words(rnd, 5, 15), rnd.randint(1, 9999),
+                        _words(rnd, 2, 4), _words(rnd, 1, 3),
+                        _words(rnd, 1, 4),
+                    )
+                )
+            if rnd.random() < 0.3:
+                parts.append('<img src="/img/%d.png" alt="%s"><br>\n'
+                             % (rnd.randint(1, 999), _words(rnd, 1, 3)))
+            parts.append('</article>\n')
+        parts.append('<table class="data">\n<thead><tr><th>a</th>'
+                     '<th>b</th></tr></thead>\n<tbody>\n')
+        for _ in range(rnd.randint(3, 10)):
+            parts.append('<tr><td>%d</td><td>%s</td></tr>\n'
+                         % (rnd.randint(0, 999), _words(rnd, 1, 3)))
+        parts.append(
+            '</tbody></table>\n<form action="/search" method="get">'
+            '<input type="text" name="q" placeholder="search">'
+            '<button type="submit">go</button></form>\n</main>\n'
+            '<footer><p>%s</p></footer>\n</body>\n</html>\n'
+            % _words(rnd, 4, 10)
+        )
+        return ''.join(parts)
+    return _fill(rnd, size, '', make)
+
+
+def attributes(rnd, size):
+    """Elements with many attributes. """
+    def make(rnd, num):
+        return (
+            '<div class="row col-md-%d %s" id=item%d data-id="%d" '
+            "data-bind='text: %s' aria-label=%s hidden tabindex=0 "
+            'style="color: #%06x; margin: %dpx">\n'
+            '  <input type=checkbox name="opt[%d]" value="%s" checked '
+            'disabled data-a=1 data-b=2 data-c=3 data-d=4>\n'
+            '  <span class=a class=b title="%s">%s</span>\n'
+            '</div>\n' % (
+                rnd.randint(1, 12), rnd.choice(WORDS), num, num,
+                rnd.choice(WORDS), rnd.choice(WORDS),
+                rnd.randint(0, 0xffffff), rnd.randint(0, 40), num,
+                _words(rnd, 1, 3), _words(rnd, 2, 6), _words(rnd, 1, 4),
+            )
+        )
+    return _fill(rnd, size, '<!DOCTYPE html>\n<body>\n', make,
+                 '</body>\n')
+
+
+def script(rnd, size):
+    """A single huge inline script. """
+    def make(rnd, num):
+        return rnd.choice([
+            'var x%d = "<div class=\\"a\\">" + y + "</div>";\n',
+            'if (a%d < b && c > d) { e = \'</p>\'; }\n',
+            'for (var i = 0; i < n%d; i++) { s += "<b>" + i; }\n',
+            'document.write("<scr" + "ipt src=x%d.js></scr" + "ipt>");\n',
+            '// <!-- comment %d --> </span>\n',
+        ]) % num
+    return _fill(rnd, size, '<!DOCTYPE html>\n<body>\n<script>\n', make,
+                 '</script>\n</body>\n')
+
+
+def nesting(rnd, size):
+    """Deep lists and tables without end tags for their items. """
+    def make(rnd, num):
+        depth = rnd.randint(5, 25)
+        kind = num % 3
+        if kind == 0:
+            return '<ul>' + ''.join(
+                '<li>%s<ul>' % _words(rnd, 1, 3) for _ in range(depth)
+            ) + '<li>x' + '</ul>' * (depth + 1) + '\n'
+        if kind == 1:
+            return '<dl>' + ''.join(
+                '<dt>%s<dd>%s' % (_words(rnd, 1, 2), _words(rnd, 1, 4))
+                for _ in range(depth)
+            ) + '</dl>\n'
+        return '<table>' + ''.join(
+            '<tr>' + ''.join('<td>%d' % cell for cell in range(5))
+            for _ in range(depth)
+        ) + '</table>\n'
+    return _fill(rnd, size, '<!DOCTYPE html>\n<body>\n', make,
+                 '</body>\n')
+
+
+def comments(rnd, size):
+    """Comments full of `--`. """
+    def make(rnd, num):
+        return '<!-- %s -- %s --- %s -->\n<p>%d</p>\n' % (
+            ' -- '.join(_words(rnd, 1, 3) for _ in range(rnd.randint(1, 8))),
+            _words(rnd, 1, 5), '--' * rnd.randint(1, 10), num,
+        )
+    return _fill(rnd, size, '<!DOCTYPE html>\n<body>\n', make,
+                 '</body>\n')
+
+
+def entities(rnd, size):
+    """Urls and text dense with `&`. """
+    def make(rnd, num):
+        query = '&'.join('%s=%d' % (rnd.choice(WORDS), rnd.randint(0, 99))
+                         for _ in range(rnd.randint(2, 8)))
+        return (
+            '<a href="/s?%s&amp;n=%d&#38;x">Tom &amp; Jerry & co '
+            '&lt;3 &#169; &copy &unknown; &#x26;</a>\n' % (query, num)
+        )
+    return _fill(rnd, size, '<!DOCTYPE html>\n<body>\n', make,
+                 '</body>\n')
+
+
+def stray(rnd, size):
+    """Stray end tags and `<` characters which do not start tags. """
+    def make(rnd, num):
+        return rnd.choice([
+            '<p>%s </span> %s</div>\n',
+            'a < b and c <= d <%s\n',
+            '<b>%s</i></q> %s\n',
+            '<< <1 </ > %s\n',
+        ]).replace('%s', rnd.choice(WORDS)) + ('<!-- %d -->' % num)
+    return _fill(rnd, size, '<!DOCTYPE html>\n<body>\n', make,
+                 '</body>\n')
+
+
+SCENARIOS = OrderedDict([
+    ('page', page),
+    ('attributes', attributes),
+    ('script', script),
+    ('nesting', nesting),
+    ('comments', comments),
+    ('entities', entities),
+    ('stray', stray),
+])
+
+
+def generate(name, size, seed=0):
+    """Return the text of the scenario `name` with at least `size`
+    characters. """
+    return SCENARIOS[name](random.Random('%s-%d' % (name, seed)), size)
@@ -0,0 +1,33 @@
+"""HTML: parser BENCHMARKS test
+
+Testing suite for the corpus and the comparison of the benchmarks.
+
+"""
+
+from nose.tools import eq_, ok_
+
+import bench
+import corpus
+
+
+def test_corpus():
+    """benchmarks.corpus: deterministic scenarios """
+    for name in corpus.SCENARIOS:
+        text = corpus.generate(name, 4096)
+        ok_(len(text) >= 4096)
+        eq_(text, corpus.generate(name, 4096))
+        ok_(text != corpus.generate(name, 4096, seed=1))
+
+
+def test_compare():
+    """benchmarks.bench: slowdowns against the baseline """
+    results = bench.run(['nesting'], size=2048, repeat=1, node_parsers=True)
+    entry = results['scenarios']['nesting']
+    ok_(entry['nodes'] > 1 and entry['messages'] > 0)
+    ok_(entry['peak_mb'] >= 0)
+    ok_(entry['node_parsers']['ElementNP']['hits'] > 0)
+    eq_(bench.compare(results, results), [])
+    slow = dict(entry, mb_per_s=entry['mb_per_s'] / 2)
+    failures = bench.compare({'scenarios': {'nesting': slow}}, results)
+    eq_(len(failures), 1)
+    ok_(failures[0].startswith('nesting: mb_per_s'))
@@ -4,6 +4,39 @@ This style attempts to follow all the HTML rules. It captures all the
 information in the file. This includes all the extra spaces, new
 lines and tab characters the file might contain.
 
+Options:
+
+- instrument: When `'true'` the calls to the node parsers are counted
+  and timed. See the `instrument` module.
+- lazy_attributes: When `'true'` the attributes of the elements are
+  read only when they are first accessed. See the `element` module.
+- messages: `'false'` turns off the messages of the node parsers.
+- message_limit: maximum number of messages issued per code, `'0'`
+  means no limit. See the `messages` module.
+- text_spans: When `'true'` the nodes holding character data keep
+  the location of their content and only copy it when it is read.
+  See the `spans` module.
+
+Documents may also be parsed in pieces with the `StreamParser` from
+the `stream` module, or turned into events without building a tree
+with the `EventParser` from the `events` module. The function
+`parse_compact` from the `compact` module stores the document in
+arrays and the `SelectiveParser` from the `selective` module only
+builds the requested elements. The `IncrementalParser` from the
+`incremental` module updates a document after its text is edited and
+the `CachingParser` from the `cache` module reuses the documents and
+elements it has already parsed.
+Many documents are parsed in worker processes with `parse_many` from
+the `batch` module and a single large document with `parse_parallel`
+from the `parallel` module. The documents are saved in binary files
+with `save_snapshot` and read back without parsing them again with
+`load_snapshot` from the `snapshot` module. Files and bytes are parsed
+with `parse_file` and `parse_bytes` from the `source` module, which
+find their encoding.
+The `tokens` module splits the parse in two stages, `tokenize`
+generates a flat stream of tokens and the `TreeBuilder` builds the
+document from them.
+
 """
 
 from lexor import init, load_aux
@@ -20,14 +53,63 @@ INFO = init(
     path=__file__
 )
 MOD = load_aux(INFO)
+DEFAULTS = {
+    'instrument': 'false',
+    'lazy_attributes': 'false',
+    'messages': 'true',
+    'message_limit': '0',
+    'text_spans': 'false',
+}
+REPOSITORY = [
+    MOD['element'].ElementNP,
+    MOD['cdata'].CDataNP,
+    MOD['doctype'].DocumentTypeNP,
+    MOD['comment'].CommentNP,
+    MOD['pi'].ProcessingInstructionNP,
+    MOD['entity'].EntityNP,
+]
 MAPPING = {
     '__default__': (
         '<&', [
-            MOD['element'].ElementNP,
-            MOD['cdata'].CDataNP,
-            MOD['doctype'].DocumentTypeNP,
-            MOD['comment'].CommentNP,
-            MOD['pi'].ProcessingInstructionNP,
-            MOD['entity'].EntityNP,
+            MOD['dispatch'].DispatchNP,
         ]),
 }
+StreamParser = MOD['stream'].StreamParser
+EventParser = MOD['events'].EventParser
+parse_compact = MOD['compact'].parse_compact
+SelectiveParser = MOD['selective'].SelectiveParser
+IncrementalParser = MOD['incremental'].IncrementalParser
+CachingParser = MOD['cache'].CachingParser
+parse_many = MOD['batch'].parse_many
+parse_parallel = MOD['parallel'].parse_parallel
+save_snapshot = MOD['snapshot'].save_snapshot
+load_snapshot = MOD['snapshot'].load_snapshot
+parse_file = MOD['source'].parse_file
+parse_bytes = MOD['source'].parse_bytes
+tokenize = MOD['tokens'].tokenize
+TreeBuilder = MOD['tokens'].TreeBuilder
+
+
+def pre_process(parser):
+    """Create the objects shared by the node parsers. """
+    parser.partial = getattr(parser, 'partial', False)
+    start = getattr(parser, 'start_pos', None)
+    if start is not None:
+        parser.pos = list(start)
+    parser.boundary = MOD['boundary'].Boundary(parser.text)
+    parser.lines = MOD['lines'].LineIndex(parser.text, parser.pos)
+    parser.messages = MOD['messages'].from_options(parser.defaults)
+    # The `StreamParser` counts the messages it has already released.
+    parser.messages.count.update(getattr(parser, 'message_count', ()))
+    parser.text_spans = parser.defaults.get('text_spans') == 'true' and \
+        not getattr(parser, 'tag_events', False)
+    parser.instrumentation = MOD['instrument'].setup(parser)
+    # The element node parser finds the element closed by a tag
+    # without asking each element in progress.
+    parser._close_node = parser['ElementNP'].close_node
+
+
+def post_process(parser):
+    """Report the statistics of an instrumented parse. """
+    if parser.instrumentation is not None:
+        parser.instrumentation.finish()
@@ -0,0 +1,176 @@
+"""HTML: BATCH parsing
+
+`parse_many` parses a sequence of documents in worker processes.
+The documents are sent to the workers in chunks and each worker keeps
+one `EventParser` per set of options, the style and its node parsers
+are only set up once per worker.
+
+    for index, doc, messages in parse_many(texts, chunksize=32):
+        for element in doc.find_all('a'):
+            href = doc.get(element, 'href')
+
+Each document is returned as a `CompactDocument`, see the `compact`
+module, whose attributes have already been read, and the messages of
+its parse as a list of tuples `(module, code, position, arg)`. Both
+are cheap to send from one process to another. The function
+`make_log` turns the messages back into a log.
+
+The results are generated in the order of `texts` or, with
+`ordered=False`, as soon as their chunk is parsed. The input may be
+an iterator, only a few chunks per worker are read ahead of the
+results.
+
+The workers are forked when the platform allows it so that they
+inherit the style loaded by the main process. They belong to a
+`multiprocessing.Pool`, one may be given to `parse_many` to parse
+several batches with the same workers.
+
+"""
+
+import sys
+import multiprocessing
+from collections import deque
+from itertools import islice
+from lexor.command.lang import load_rel, map_explanations
+from lexor.core.elements import Document, Void
+
+COMPACT = load_rel(__file__, 'compact')
+PARSERS = dict()
+
+# Number of chunks per worker sent ahead of the results.
+AHEAD = 2
+
+# Seconds between two checks of the chunks in progress when the
+# results are not ordered.
+POLL = 0.01
+
+
+def get_parser(defaults):
+    """Return the `EventParser` of the process for the options in
+    `defaults`. """
+    key = tuple(sorted((defaults or {}).items()))
+    try:
+        return PARSERS[key]
+    except KeyError:
+        pass
+    parser = COMPACT.EVENTS.EventParser(defaults)
+    # Loading the node parsers executes the modules of the style again,
+    # it is done before any document is created.
+    parser.load_node_parsers()
+    PARSERS[key] = parser
+    return parser
+
+
+def pack_log(log):
+    """Return the messages of a log as a list of tuples. """
+    return [(msg['module'], msg['code'], tuple(msg['position']),
+             msg['arg']) for msg in log.child]
+
+
+def make_log(messages, uri=None, log=None):
+    """Create a log with the messages returned by `pack_log`. The
+    messages are appended to `log` if it is given. """
+    if log is None:
+        log = Document("lexor", "log")
+        log.modules = dict()
+        log.explanation = dict()
+    for module, code, position, arg in messages:
+        node = Void('msg')
+        node['module'] = module
+        node['code'] = code
+        node['position'] = list(position)
+        node['uri'] = uri
+        node['arg'] = arg
+        if module not in log.modules:
+            log.modules[module] = sys.modules[module]
+        log.append_child(node)
+    map_explanations(log.modules, log.explanation)
+    return log
+
+
+def parse_chunk(texts, defaults=None):
+    """Parse the strings in `texts` and return a list of pairs
+    `(doc, messages)`. This is the task run by the workers. """
+    parser = get_parser(defaults)
+    results = list()
+    for text in texts:
+        doc, log = COMPACT.parse_compact(text, parser=parser)
+        doc.read_attributes()
+        results.append((doc, pack_log(log)))
+    return results
+
+
+def make_pool(workers=None, initializer=None, initargs=()):
+    """Return a `multiprocessing.Pool` whose processes are forked if
+    possible. Each process calls `initializer` with `initargs` when
+    it starts. """
+    try:
+        context = multiprocessing.get_context('fork')
+    except (AttributeError, ValueError):
+        context = multiprocessing
+    return context.Pool(workers, initializer, initargs)
+
+
+def parse_many(texts, defaults=None, workers=None, chunksize=16,
+               ordered=True, pool=None):
+    """Parse the strings in `texts` in `workers` processes and
+    generate tuples `(index, doc, messages)`, where `index` is the
+    position of the text in `texts`. The documents are sent in chunks
+    of `chunksize` texts. A `pool` may be given instead of creating
+    one, it is not terminated at the end. """
+    if chunksize < 1:
+        raise ValueError('chunksize must be positive')
+    own = pool is None
+    if own:
+        pool = make_pool(workers)
+    ahead = AHEAD * (workers or multiprocessing.cpu_count())
+    chunks = _chunks(texts, chunksize)
+    pending = deque()
+    try:
+        _submit(pool, pending, islice(chunks, ahead), defaults)
+        while pending:
+            if ordered:
+                start, result = pending.popleft()
+            else:
+                start, result = _first_ready(pending)
+            results = result.get()
+            _submit(pool, pending, islice(chunks, 1), defaults)
+            for num, (doc, messages) in enumerate(results):
+                yield start + num, doc, messages
+    finally:
+        if own:
+            pool.terminate()
+            pool.join()
+
+
+def _submit(pool, pending, chunks, defaults):
+    """Send the `chunks` to the workers, the pairs `(start, result)`
+    with the index of the first text of a chunk and its `AsyncResult`
+    are appended to `pending`. """
+    for start, chunk in chunks:
+        pending.append((start, pool.apply_async(parse_chunk,
+                                                (chunk, defaults))))
+
+
+def _first_ready(pending):
+    """Remove and return the first pair of `pending` whose chunk is
+    parsed, waiting for one if needed. """
+    while True:
+        for item in pending:
+            if item[1].ready():
+                pending.remove(item)
+                return item
+        pending[0][1].wait(POLL)
+
+
+def _chunks(texts, chunksize):
+    """Generate pairs `(index, chunk)` with lists of `chunksize`
+    texts and the index of their first text. """
+    texts = iter(texts)
+    index = 0
+    while True:
+        chunk = list(islice(texts, chunksize))
+        if not chunk:
+            return
+        yield index, chunk
+        index += len(chunk)
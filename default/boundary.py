@@ -0,0 +1,42 @@
+"""HTML: BOUNDARY cache
+
+The node parsers often need to know where the next `<` or `>` is
+located. Searching the text from the caret every time makes the
+parsing of documents with many unterminated tags quadratic, i.e.
+
+    <x <x <x <x <x ...
+
+Since the caret only moves forward we can remember the last search
+for each character and answer most of the queries without looking
+at the text again.
+
+"""
+
+
+class Boundary(object):
+    """Keeps the index of the next occurrence of some characters in
+    the text being parsed. """
+
+    def __init__(self, text):
+        self.text = text
+        self.cache = dict()
+
+    def find(self, char, start):
+        """Return the lowest index in the text where `char` is found
+        at or after `start`. Return -1 if it is not found. """
+        try:
+            begin, index = self.cache[char]
+        except KeyError:
+            begin, index = None, None
+        if begin is not None and (index == -1 or start <= index):
+            if begin <= start:
+                return index
+            tmp = self.text.find(char, start, begin)
+            if tmp == -1:
+                self.cache[char] = (start, index)
+                return index
+            self.cache[char] = (start, tmp)
+            return tmp
+        index = self.text.find(char, start)
+        self.cache[char] = (start, index)
+        return index
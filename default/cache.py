@@ -0,0 +1,311 @@
+"""HTML: CACHING parser
+
+The `CachingParser` keeps the documents it has parsed, keyed by a
+hash of their text. Parsing a text seen before returns a copy of the
+stored document and log instead of running the node parsers:
+
+    parser = CachingParser(size=64)
+    parser.parse(text)
+    doc = parser.doc
+
+The stored documents are never handed out, each parse gets its own
+copy so that changing the document does not change the cache. Since
+storing a document costs a copy, a document is only stored the second
+time its text is parsed, the first time only its hash is remembered.
+When more than `size` documents are stored the least recently used
+one is dropped.
+
+The elements at the top of a document which are closed by their own
+end tag are also remembered, keyed by a hash of the text from their
+opening tag to their end tag. The node parsers never look past such
+an end tag, so the same text at the top of any document produces the
+same nodes and messages, only their positions differ. When the parser
+reaches the opening tag of one of these elements it copies the stored
+nodes and messages to their new position and moves past the end tag.
+At most `fragment_size` elements are kept, the ones shorter than
+`MIN_FRAGMENT` characters are not worth it. The elements are not
+reused when the number of messages is limited.
+
+The counts of hits, misses and evictions of both caches are given by
+`stats`. The caches are emptied when the node parsers are loaded
+again, for instance after the options change.
+
+The options `lazy_attributes` and `text_spans` are ignored, the nodes
+are created with their attributes and data so that they can be
+copied.
+
+"""
+
+import sys
+import hashlib
+from collections import OrderedDict
+from lexor.command.lang import load_rel
+from lexor.core.parser import Parser
+from lexor.core.elements import Document, Void
+from lexor.util import Position
+
+# The parser reports the nodes it cannot close with the name of the
+# module of its class.
+from lexor.core.parser import MSG, MSG_EXPLANATION
+
+INCREMENTAL = load_rel(__file__, 'incremental')
+
+# Minimum number of characters of an element to remember it.
+MIN_FRAGMENT = 64
+
+# Number of hashes of documents parsed once kept per stored document.
+SEEN = 4
+
+
+class CachingParser(Parser):
+    """Parses html with the `default` style and reuses the documents
+    and top level elements it has already parsed. """
+
+    def __init__(self, defaults=None, size=64, fragment_size=1024):
+        defaults = dict(defaults or ())
+        defaults['lazy_attributes'] = 'false'
+        defaults['text_spans'] = 'false'
+        Parser.__init__(self, 'html', 'default', defaults)
+        self.size = size
+        self.fragment_size = fragment_size
+        self.documents = OrderedDict()
+        self.seen = OrderedDict()
+        self.fragments = OrderedDict()
+        self.openings = dict()
+        self.counts = dict.fromkeys([
+            'hits', 'misses', 'evictions', 'fragment_hits',
+            'fragment_misses', 'fragment_evictions'
+        ], 0)
+
+    def stats(self):
+        """Return a dictionary with the number of hits, misses and
+        evictions of the document and fragment caches and the number
+        of entries in each. """
+        stats = dict(self.counts)
+        stats['documents'] = len(self.documents)
+        stats['fragments'] = len(self.fragments)
+        return stats
+
+    def load_node_parsers(self):
+        """Load the node parsers and empty the caches. """
+        Parser.load_node_parsers(self)
+        self.documents.clear()
+        self.seen.clear()
+        self.fragments.clear()
+        self.openings.clear()
+
+    def parse(self, text, uri=None):
+        """Same as `Parser.parse` but the document and log are copied
+        from the cache if `text` has already been parsed. """
+        if self._reload:
+            self.load_node_parsers()
+        key = digest(text)
+        entry = self.documents.pop(key, None)
+        if entry is None:
+            self.counts['misses'] += 1
+            Parser.parse(self, text, uri)
+            if self.seen.pop(key, None) is None:
+                self.seen[key] = True
+                while len(self.seen) > SEEN * self.size:
+                    self.seen.popitem(False)
+                return
+            entry = (copy_tree(self.doc), copy_log(self.log))
+        else:
+            self.counts['hits'] += 1
+            self.text = text
+            self.end = len(text)
+            self.caret = self.end
+            if uri:
+                self._uri = uri
+            else:
+                self._uri = 'string@0x%x' % id(text)
+            self.doc = copy_tree(entry[0])
+            self.doc.uri_ = self._uri
+            self.log = copy_log(entry[1], self._uri)
+        self.documents[key] = entry
+        while len(self.documents) > self.size:
+            self.documents.popitem(False)
+            self.counts['evictions'] += 1
+
+    def _parse(self):
+        """Main parsing function. It follows `Parser._parse` but it
+        copies the top level elements it has seen before. """
+        self.current_node = crt = self.doc
+        self._in_progress = []
+        memo = self.fragment_size > 0 and not self.messages.limit
+        start = None
+        while self.caret < self.end:
+            caret = self.caret
+            num = len(self.log)
+            tmp = self._close_node()
+            if tmp is not None:
+                self.current_node = crt = tmp
+                if tmp is self.doc and start is not None:
+                    if memo and self.caret > caret:
+                        self._remember(start)
+                    start = None
+                continue
+            if memo and crt is self.doc and self._reuse():
+                continue
+            match = False
+            processor = None
+            for processor in self._get_np(crt):
+                node = processor.make_node()
+                if node is not None:
+                    match = True
+                    break
+                elif self.caret == self.end:
+                    break
+            if match is False:
+                self._process_text(crt)
+            elif self._process_node(crt, node, processor) is node:
+                self.current_node = crt = node
+                if len(self._in_progress) == 1:
+                    self.counts['fragment_misses'] += 1
+                    start = (caret, num)
+        for node, processor in self._in_progress:
+            node_pos = node.node_position
+            self.msg(self.__module__, 'E100', node_pos, [node.name])
+
+    def _opening(self, caret):
+        """Return the opening tag at `caret` or None. """
+        if self.text[caret+1:caret+2] in ('', '/', '!', '?'):
+            return None
+        end = self.boundary.find('>', caret)
+        if end == -1:
+            return None
+        return self.text[caret:end+1]
+
+    def _remember(self, start):
+        """Store the last child of the document, which starts at the
+        index given in `start` with the number of messages issued
+        before it. """
+        caret, num = start
+        length = self.caret - caret
+        if length < MIN_FRAGMENT:
+            return
+        key = digest(self.text[caret:self.caret])
+        if key in self.fragments:
+            return
+        opening = self._opening(caret)
+        self.fragments[key] = (
+            copy_tree(self.doc[len(self.doc)-1]),
+            [copy_message(msg) for msg in self.log.child[num:]],
+            tuple(self.lines.position(caret)),
+            caret,
+            opening,
+            length,
+        )
+        lengths = self.openings.setdefault(opening, dict())
+        lengths[length] = lengths.get(length, 0) + 1
+        while len(self.fragments) > self.fragment_size:
+            _, entry = self.fragments.popitem(False)
+            self.counts['fragment_evictions'] += 1
+            lengths = self.openings[entry[4]]
+            lengths[entry[5]] -= 1
+            if not lengths[entry[5]]:
+                del lengths[entry[5]]
+            if not lengths:
+                del self.openings[entry[4]]
+
+    def _reuse(self):
+        """Copy a stored element if its text is found at the caret and
+        return True in that case. """
+        caret = self.caret
+        if self.text[caret] != '<':
+            return False
+        lengths = self.openings.get(self._opening(caret))
+        if not lengths:
+            return False
+        for length in lengths:
+            if caret + length > self.end:
+                continue
+            key = digest(self.text[caret:caret+length])
+            entry = self.fragments.pop(key, None)
+            if entry is not None:
+                break
+        else:
+            return False
+        self.fragments[key] = entry
+        self.counts['fragment_hits'] += 1
+        node, messages, old, start, _, _ = entry
+        new = tuple(self.copy_pos())
+        self.doc.append_child(
+            copy_tree(node, self.lines, caret - start, old, new)
+        )
+        for msg in messages:
+            msg = copy_message(msg, self._uri)
+            INCREMENTAL.shift_message(msg, old, new)
+            if msg['module'] not in self.log.modules:
+                self.log.modules[msg['module']] = sys.modules[msg['module']]
+            self.log.append_child(msg)
+        self.update(caret + length)
+        return True
+
+
+def digest(text):
+    """Return the hash used as the key of a text. A byte string is
+    hashed as it is, other strings are encoded in UTF-8 first. """
+    if not isinstance(text, bytes):
+        text = text.encode('utf-8')
+    return hashlib.sha1(text).digest()
+
+
+def copy_node(node, lines=None, delta=0, old=None, new=None):
+    """Return a copy of `node` without its children. When `lines` is
+    given the copy is moved `delta` characters forward in the text of
+    `lines`, `old` and `new` are the positions of the first character
+    of the moved text before and after. """
+    if isinstance(node, Document):
+        clone = node.clone_node(False)
+    else:
+        clone = node.clone_node()
+    if lines is not None:
+        clone.set_position(*INCREMENTAL.shift(node.node_position, old, new))
+    pos = getattr(node, 'pos', None)
+    if pos is not None:
+        clone.pos = pos if lines is None else lines.locate(pos.offset + delta)
+    return clone
+
+
+def copy_tree(node, lines=None, delta=0, old=None, new=None):
+    """Return a copy of `node` and all of its descendants, see
+    `copy_node`. """
+    root = copy_node(node, lines, delta, old, new)
+    stack = [(node, root)]
+    while stack:
+        source, target = stack.pop()
+        if not source.child:
+            continue
+        for child in source.child:
+            clone = copy_node(child, lines, delta, old, new)
+            target.append_child(clone)
+            stack.append((child, clone))
+    return root
+
+
+def copy_message(msg, uri=None):
+    """Return a copy of a message. The `uri` of the copy may be
+    changed. """
+    node = Void('msg')
+    node['module'] = msg['module']
+    node['code'] = msg['code']
+    node['position'] = list(msg['position'])
+    node['uri'] = msg['uri'] if uri is None else uri
+    arg = msg['arg']
+    node['arg'] = type(arg)(
+        Position((item.line, item.column), item.fmt)
+        if isinstance(item, Position) else item for item in arg
+    )
+    return node
+
+
+def copy_log(log, uri=None):
+    """Return a copy of a log. The `uri` of the messages may be
+    changed. """
+    clone = Document("lexor", "log")
+    clone.modules = dict(log.modules)
+    clone.explanation = dict(log.explanation)
+    for msg in log.child:
+        clone.append_child(copy_message(msg, uri))
+    return clone
@@ -18,9 +18,12 @@ is
 
 """
 
+from lexor.command.lang import load_rel
 from lexor.core.parser import NodeParser
 from lexor.core.elements import CData
 
+SPANS = load_rel(__file__, 'spans')
+
 
 class CDataNP(NodeParser):
     """Retrives the data enclosed within `<![CDATA[` and `]]>` and
@@ -33,11 +36,14 @@ class CDataNP(NodeParser):
             return None
         index = parser.text.find(']]>', caret+9)
         if index == -1:
-            self.msg('E100', parser.pos)
+            if parser.partial:
+                parser.need_input()
+            if parser.messages.accept(self, 'E100'):
+                self.msg('E100', parser.pos)
             parser.update(parser.end)
-            return CData(parser.text[caret+9:parser.end])
+            return SPANS.make(parser, CData, caret+9, parser.end)
         parser.update(index+3)
-        return CData(parser.text[caret+9:index])
+        return SPANS.make(parser, CData, caret+9, index)
 
 
 MSG = {
@@ -8,29 +8,65 @@ See: <http://www.w3.org/TR/REC-xml/#sec-comments>
 
 """
 
+import re
+from lexor.command.lang import load_rel
 from lexor.core.parser import NodeParser
-from lexor.core.writer import replace
 from lexor.core.elements import Comment
 
+SPANS = load_rel(__file__, 'spans')
+
+RE_DASHES = re.compile('-{2,}')
+
 
 class CommentNP(NodeParser):
     """Creates `Comment` nodes from comments written in HTML. """
 
     def _handle_bogus(self, parser, caret):
         """Helper method for make_node. """
-        self.msg('E100', parser.pos)
         index = parser.text.find('>', caret+2)
+        if index == -1 and parser.partial:
+            parser.need_input()
+        if parser.messages.accept(self, 'E100'):
+            self.msg('E100', parser.pos)
         if index == -1:
             parser.update(parser.end)
-            self.msg('E201', parser.pos)
+            if parser.messages.accept(self, 'E201'):
+                self.msg('E201', parser.pos)
             content = parser.text[caret+2:parser.end]
-            return Comment(replace(content, ('--', '- ')))
-        pos = parser.compute(index)
-        self.msg('E300', pos)
+            return Comment(content.replace('--', '- '))
+        if parser.messages.accept(self, 'E300'):
+            self.msg('E300', parser.lines.position(index))
         parser.update(index+1)
-        content = replace(parser.text[caret+2:index], ('--', '- '))
+        content = parser.text[caret+2:index].replace('--', '- ')
         return Comment(content)
 
+    def _make_comment(self, parser, start, end, closed):
+        """Helper method for make_node. Return a comment with
+        `text[start:end]` where every `--` is replaced by `- `.
+        Overlapping sequences count, so that `---` becomes `- - `. If
+        the comment is `closed` then the first `-` of `-->` may also
+        be part of a sequence. A single message is issued for all of
+        the sequences. """
+        text = parser.text
+        stop = end + 1 if closed else end
+        first = text.find('--', start, stop)
+        if first == -1:
+            return SPANS.make(parser, Comment, start, end)
+        pieces = []
+        count = 0
+        index = start
+        for match in RE_DASHES.finditer(text, first, stop):
+            num = match.end(0) - match.start(0) - 1
+            count += num
+            pieces.append(text[index:match.start(0)])
+            pieces.append('- ' * num)
+            index = match.end(0)
+        pieces.append(text[index:end])
+        if parser.messages.accept(self, 'E301'):
+            pos = parser.lines.position(first)
+            self.msg('E301', pos, parser.copy_pos()+(count,))
+        return Comment(''.join(pieces))
+
     def make_node(self):
         parser = self.parser
         caret = parser.caret
@@ -38,25 +74,18 @@ class CommentNP(NodeParser):
             return None
         if parser.text[caret+2:caret+4] != '--':
             return self._handle_bogus(parser, caret)
-        index = parser.text.find('--', caret+4)
+        index = parser.text.find('-->', caret+4)
         if index == -1:
-            self.msg('E200', parser.pos)
-            parser.update(parser.end)
-            return Comment(parser.text[caret+4:parser.end])
-        content = parser.text[caret+4:index]
-        while parser.text[index:index+3] != '-->':
-            self.msg('E301', parser.compute(index), tuple(parser.pos))
-            content += '- '
-            newindex = parser.text.find('--', index+1)
-            if newindex == -1:
-                content += parser.text[index+2:parser.end]
+            if parser.partial:
+                parser.need_input()
+            node = self._make_comment(parser, caret+4, parser.end, False)
+            if parser.messages.accept(self, 'E200'):
                 self.msg('E200', parser.pos)
-                parser.update(parser.end)
-                return Comment(content)
-            content += parser.text[index+2:newindex]
-            index = newindex
+            parser.update(parser.end)
+            return node
+        node = self._make_comment(parser, caret+4, index, True)
         parser.update(index+3)
-        return Comment(content)
+        return node
 
 
 MSG = {
@@ -64,7 +93,7 @@ MSG = {
     'E200': '`-->` not found',
     'E201': '`>` not found',
     'E300': '`>` found',
-    'E301': '`--` in comment opened at {0}:{1:2}',
+    'E301': '`--` found {2} time(s) in comment opened at {0}:{1:2}',
 }
 MSG_EXPLANATION = [
     """
@@ -107,6 +136,9 @@ MSG_EXPLANATION = [
 
     - This sequence will be interpreted as `- `.
 
+    - Only one message is issued per comment. It points to the first
+      `--` and tells you how many of them were found.
+
     Okay: <!-- 1 - 2 - 3 - 4 - 5 -->
     E301: <!-- 1 -- 2 -- 3 -- 4 -- 5 -->
 """,
@@ -0,0 +1,421 @@
+"""HTML: COMPACT document
+
+A `CompactDocument` stores a parsed document in a few arrays instead
+of creating an object for each node. The nodes are numbered in the
+order in which they appear in the text, node `0` being the document
+itself, and for each node the arrays store
+
+    kind            one of the constants defined below
+    tag             index of the name of the node in `names`
+    parent          index of the parent
+    first_child     index of the first child or -1
+    next_sibling    index of the next sibling or -1
+    start, end      the span of the text which produced the node
+    data_start      index in the text where the data starts or -1
+    data_length     length of the data
+    attribute_start span of the text declaring the attributes of an
+    attribute_end   element, -1 if there is no such text
+
+Since the nodes are numbered in document order, visiting all the nodes
+is a loop over a range. The data of a node is taken from the text when
+it is requested. The few nodes whose data cannot be found in the text,
+for instance comments in which `--` was replaced, store it in the
+dictionary `extra`. The attributes are only read when they are
+requested.
+
+The document is built from the events of the `events` module:
+
+    doc = parse_compact(text)
+    for index in doc.find_all('a'):
+        href = doc.get(index, 'href')
+
+`NodeView` provides the navigation properties of the nodes in
+`lexor.core.elements` for code that needs them and `to_document`
+creates the actual document.
+
+"""
+
+from array import array
+from itertools import chain, islice
+from lexor.command.lang import load_rel
+from lexor.core.elements import Document, Element, Void, RawText, Text, \
+    Comment, CData, DocumentType, ProcessingInstruction, Entity
+
+EVENTS = load_rel(__file__, 'events')
+
+DOCUMENT = 0
+ELEMENT = 1
+VOID = 2
+RAWTEXT = 3
+TEXT = 4
+COMMENT = 5
+CDATA = 6
+DOCTYPE = 7
+PI = 8
+ENTITY = 9
+
+KIND = {
+    'text': (TEXT, '#text'),
+    'comment': (COMMENT, '#comment'),
+    'cdata': (CDATA, '#cdata-section'),
+    'doctype': (DOCTYPE, '#doctype'),
+    'entity': (ENTITY, '#entity'),
+}
+NODE_CLASS = {
+    TEXT: Text,
+    COMMENT: Comment,
+    CDATA: CData,
+    DOCTYPE: DocumentType,
+    ENTITY: Entity,
+}
+
+
+class CompactDocument(object):
+    """A document stored in arrays. """
+
+    def __init__(self, text, reader=None, lines=None):
+        self.text = text
+        self.reader = reader
+        self.lines = lines
+        self.names = ['#document']
+        self.name_index = {'#document': 0}
+        self.kind = array('b', [DOCUMENT])
+        self.tag = array('i', [0])
+        self.parent = array('i', [-1])
+        self.first_child = array('i', [-1])
+        self.next_sibling = array('i', [-1])
+        self.start = array('i', [0])
+        self.end = array('i', [len(text)])
+        self.data_start = array('i', [-1])
+        self.data_length = array('i', [0])
+        self.attribute_start = array('i', [-1])
+        self.attribute_end = array('i', [-1])
+        self.extra = dict()
+        self.attribute_cache = dict()
+
+    def __len__(self):
+        return len(self.kind)
+
+    def intern(self, name):
+        """Return the index of `name` in `names`. """
+        try:
+            return self.name_index[name]
+        except KeyError:
+            self.name_index[name] = len(self.names)
+            self.names.append(name)
+            return self.name_index[name]
+
+    def append(self, kind, name, parent, last, start, end, data=None,
+               span=None):
+        """Add a node as the last child of `parent`. The index of the
+        current last child of `parent` must be given in `last`. The
+        `span` of the attributes may be given for elements. """
+        index = len(self.kind)
+        self.kind.append(kind)
+        self.tag.append(self.intern(name))
+        self.parent.append(parent)
+        self.first_child.append(-1)
+        self.next_sibling.append(-1)
+        self.start.append(start)
+        self.end.append(end)
+        if span is None:
+            self.attribute_start.append(-1)
+            self.attribute_end.append(-1)
+        else:
+            self.attribute_start.append(span[0])
+            self.attribute_end.append(span[1])
+        if last == -1:
+            self.first_child[parent] = index
+        else:
+            self.next_sibling[last] = index
+        if data is None:
+            self.data_start.append(-1)
+            self.data_length.append(0)
+        else:
+            self.set_data(index, data, start, end)
+        return index
+
+    def set_data(self, index, data, start, end):
+        """Locate `data` in the span of the node. """
+        data_start = self.text.find(data, start, end) if data else start
+        self.data_length.append(len(data))
+        if data_start == -1:
+            self.data_start.append(-1)
+            self.extra[index] = data
+        else:
+            self.data_start.append(data_start)
+
+    def name(self, index):
+        """Return the name of a node. """
+        return self.names[self.tag[index]]
+
+    def data(self, index):
+        """Return the data of a node or None if it has none. """
+        start = self.data_start[index]
+        if start == -1:
+            return self.extra.get(index)
+        return self.text[start:start+self.data_length[index]]
+
+    def children(self, index):
+        """Generate the indices of the children of a node. """
+        child = self.first_child[index]
+        while child != -1:
+            yield child
+            child = self.next_sibling[child]
+
+    def find_all(self, name):
+        """Generate the indices of the elements with the given name.
+        """
+        tag = self.name_index.get(name)
+        if tag is None:
+            return
+        kind = self.kind
+        index = 0
+        for value in self.tag:
+            if value == tag and ELEMENT <= kind[index] <= RAWTEXT:
+                yield index
+            index += 1
+
+    def attributes(self, index):
+        """Return a list of `(name, value)` pairs with the attributes
+        of an element. """
+        try:
+            return self.attribute_cache[index]
+        except KeyError:
+            pass
+        items = []
+        start = self.attribute_start[index]
+        if start != -1:
+            element = Element(self.name(index))
+            self.reader.read(element, start, self.attribute_end[index])
+            items = element.items()
+        self.attribute_cache[index] = items
+        return items
+
+    def read_attributes(self):
+        """Read the attributes of all the elements. Afterwards the
+        reader of the parse is no longer needed. """
+        kind = self.kind
+        for index in range(len(kind)):
+            if ELEMENT <= kind[index] <= RAWTEXT:
+                self.attributes(index)
+
+    def __getstate__(self):
+        """The reader is not kept when the document is pickled, call
+        `read_attributes` before. """
+        state = self.__dict__.copy()
+        state['reader'] = None
+        return state
+
+    def get(self, index, name, val=''):
+        """Return the value of an attribute of an element. """
+        for key, value in self.attributes(index):
+            if key == name:
+                return value
+        return val
+
+    def position(self, index):
+        """Return the position `[line, column]` where a node starts. """
+        return self.lines.position(self.start[index])
+
+    def view(self, index=0):
+        """Return a `NodeView` of a node. """
+        return NodeView(self, index)
+
+    def to_node(self, index):
+        """Create the `lexor` node of the given index without its
+        children. """
+        kind = self.kind[index]
+        name = self.name(index)
+        if kind == ELEMENT:
+            node = Element(name)
+        elif kind == VOID:
+            node = Void(name)
+        elif kind == RAWTEXT:
+            node = RawText(name, self.data(index))
+        elif kind == PI:
+            node = ProcessingInstruction(name, self.data(index))
+        else:
+            node = NODE_CLASS[kind](self.data(index))
+        if ELEMENT <= kind <= RAWTEXT:
+            for key, value in self.attributes(index):
+                node[key] = value
+        return node
+
+    def to_document(self):
+        """Create the equivalent `lexor` document. """
+        doc = Document('html')
+        nodes = [doc]
+        for index in range(1, len(self.kind)):
+            node = self.to_node(index)
+            nodes.append(node)
+            nodes[self.parent[index]].append_child(node)
+        return doc
+
+
+class NodeView(object):
+    """Provides the navigation properties of `lexor` nodes for a node
+    in a `CompactDocument`. """
+
+    __slots__ = ('doc', 'index')
+
+    def __init__(self, doc, index):
+        self.doc = doc
+        self.index = index
+
+    def _view(self, index):
+        """Return the view of `index` or None if it is -1. """
+        if index == -1:
+            return None
+        return NodeView(self.doc, index)
+
+    def __eq__(self, other):
+        return isinstance(other, NodeView) and \
+            self.doc is other.doc and self.index == other.index
+
+    def __ne__(self, other):
+        return not self.__eq__(other)
+
+    def __hash__(self):
+        return hash((id(self.doc), self.index))
+
+    @property
+    def name(self):
+        """The name of the node. """
+        return self.doc.name(self.index)
+
+    node_name = name
+
+    @property
+    def data(self):
+        """The data of the node. """
+        return self.doc.data(self.index)
+
+    @property
+    def parent(self):
+        """The parent node. """
+        return self._view(self.doc.parent[self.index])
+
+    parent_node = parent
+
+    @property
+    def child(self):
+        """A list with the child nodes or None if the node cannot
+        have children. """
+        if self.doc.kind[self.index] not in (DOCUMENT, ELEMENT):
+            return None
+        return [NodeView(self.doc, index)
+                for index in self.doc.children(self.index)]
+
+    @property
+    def first_child(self):
+        """The first child node. """
+        return self._view(self.doc.first_child[self.index])
+
+    @property
+    def next(self):
+        """The node immediately following this node. """
+        return self._view(self.doc.next_sibling[self.index])
+
+    next_sibling = next
+
+    @property
+    def prev(self):
+        """The node immediately preceding this node. """
+        parent = self.doc.parent[self.index]
+        if parent == -1:
+            return None
+        prev = -1
+        for index in self.doc.children(parent):
+            if index == self.index:
+                break
+            prev = index
+        return self._view(prev)
+
+    previous_sibling = prev
+
+    @property
+    def node_position(self):
+        """The position where the node starts. """
+        return tuple(self.doc.position(self.index))
+
+    def items(self):
+        """Return a list of `(name, value)` pairs. """
+        if ELEMENT <= self.doc.kind[self.index] <= RAWTEXT:
+            return self.doc.attributes(self.index)
+        return []
+
+    @property
+    def attributes(self):
+        """The attribute names. """
+        return [key for key, _ in self.items()]
+
+    def get(self, k, val=''):
+        return self.doc.get(self.index, k, val)
+
+    def __contains__(self, k):
+        return k in self.attributes
+
+    def __getitem__(self, k):
+        if isinstance(k, str):
+            for key, value in self.items():
+                if key == k:
+                    return value
+            raise KeyError(k)
+        return self.child[k]
+
+    def __len__(self):
+        child = self.child
+        return 0 if child is None else len(child)
+
+    def __iter__(self):
+        return iter(self.child or [])
+
+    def __repr__(self):
+        return 'NodeView(%r, %d)' % (self.name, self.index)
+
+
+def add_events(doc, parser, events, stack):
+    """Append the nodes generated by the `events` of `parser` to
+    `doc`. Each item of `stack` is a list with the index of an open
+    element and the index of its last child, or -1. The first item is
+    the parent of the nodes. """
+    for event, val in events:
+        start, end = parser.span
+        crt = stack[-1]
+        if event == 'start':
+            kind = ELEMENT
+            if val.data is not None:
+                kind = RAWTEXT
+            elif val.has_element_ is None:
+                kind = VOID
+            if val.lazy_ is not None:
+                doc.reader = val.lazy_[0]
+            crt[1] = doc.append(kind, val.name, crt[0], crt[1],
+                                start, end, val.data, val.span)
+            stack.append([crt[1], -1])
+        elif event == 'end':
+            doc.end[stack.pop()[0]] = end
+        elif event == 'pi':
+            crt[1] = doc.append(PI, val[0], crt[0], crt[1],
+                                start, end, val[1])
+        else:
+            kind, name = KIND[event]
+            crt[1] = doc.append(kind, name, crt[0], crt[1],
+                                start, end, val)
+
+
+def parse_compact(text, defaults=None, uri=None, parser=None):
+    """Parse `text` with the `default` style and return a
+    `CompactDocument` and the log of the parse. An `EventParser` may
+    be given in `parser` to use it instead of a new one, `defaults`
+    is then ignored. """
+    if parser is None:
+        parser = EVENTS.EventParser(defaults)
+    events = parser.events(text, uri)
+    # The first event loads the node parsers, which executes the
+    # modules of the style again, the document must be created after.
+    first = list(islice(events, 1))
+    doc = CompactDocument(text, None, parser.lines)
+    add_events(doc, parser, chain(first, events), [[0, -1]])
+    return doc, parser.log
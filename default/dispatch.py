@@ -0,0 +1,124 @@
+"""HTML: DISPATCH NodeParser
+
+All the node parsers in this style start with either `<` or `&`.
+Instead of asking each one of them to inspect the text, the parser
+defined in this module reads the characters following the caret
+once and forwards the request to the node parsers that can possibly
+handle it:
+
+    <a      ElementNP, EntityNP
+    </      EntityNP
+    <!-     CommentNP
+    <![     CDataNP, CommentNP
+    <!d     DocumentTypeNP, CommentNP
+    <!      CommentNP
+    <?      ProcessingInstructionNP
+    &       EntityNP
+
+The node parsers are tried in the same order in which they used to
+be declared in the mapping so that the results do not change.
+
+When the parser is reading `partial` input, see the `stream` module,
+the dispatcher records a checkpoint every time it is called at the
+top level of the document and asks for more input if there are not
+enough characters left to recognize the node.
+
+With the option `text_spans` the dispatcher also reads the text
+between the nodes so that the `Text` nodes may hold spans, see the
+`spans` module.
+
+"""
+
+from lexor.command.lang import load_rel
+from lexor.core.parser import NodeParser
+from lexor.core.elements import Text
+
+SPANS = load_rel(__file__, 'spans')
+
+# Length of the longest prefix, `<!doctype `, needed to choose a node
+PREFIX_LENGTH = 10
+
+
+class DispatchNP(NodeParser):
+    """Forwards `make_node` and `close` to the node parsers declared
+    in the `REPOSITORY` of the style. """
+
+    def __init__(self, parser):
+        NodeParser.__init__(self, parser)
+        element = parser['ElementNP']
+        entity = parser['EntityNP']
+        comment = parser['CommentNP']
+        self.element = element
+        self.lt_element = (element, entity)
+        self.lt_other = (entity,)
+        self.amp = (entity,)
+        self.pi = (parser['ProcessingInstructionNP'],)
+        self.bang = {
+            '-': (comment,),
+            '[': (parser['CDataNP'], comment),
+            'd': (parser['DocumentTypeNP'], comment),
+            'D': (parser['DocumentTypeNP'], comment),
+        }
+        self.bogus = (comment,)
+
+    def get_candidates(self, text, caret):
+        """Return the node parsers that may create a node at the
+        given position of the text. """
+        char = text[caret:caret+1]
+        if char == '&':
+            return self.amp
+        if char != '<':
+            return None
+        char = text[caret+1:caret+2]
+        if char == '!':
+            return self.bang.get(text[caret+2:caret+3], self.bogus)
+        if char == '?':
+            return self.pi
+        if char.isalpha() or char in [":", "_"]:
+            return self.lt_element
+        return self.lt_other
+
+    def make_node(self):
+        parser = self.parser
+        if parser.partial:
+            if parser.current_node is parser.doc:
+                parser.checkpoint()
+            if parser.end - parser.caret < PREFIX_LENGTH and \
+                    parser.text[parser.caret] in '<&':
+                parser.need_input()
+        candidates = self.get_candidates(parser.text, parser.caret)
+        if candidates is None:
+            if parser.text_spans:
+                return self.make_text(parser)
+            return None
+        for processor in candidates:
+            node = processor.make_node()
+            if node is not None:
+                return node
+            elif parser.caret == parser.end:
+                break
+        return None
+
+    def make_text(self, parser):
+        """Return a `Text` node with the text found before the next
+        `<` or `&`. The parser reads the data of the `Text` nodes it
+        receives to merge them, so the node is returned in a list
+        unless it has to be merged with the previous node. """
+        caret = parser.caret
+        index = parser.end
+        for char in '<&':
+            tmp = parser.boundary.find(char, caret)
+            if tmp != -1 and tmp < index:
+                index = tmp
+        crt = parser.current_node
+        if crt.child and isinstance(crt.child[-1], Text):
+            node = Text(parser.text[caret:index])
+        else:
+            node = [SPANS.make(parser, Text, caret, index)]
+            node[0].set_position(*parser.copy_pos())
+        parser.update(index)
+        return node
+
+    def close(self, node):
+        """Only `ElementNP` returns nodes that need to be closed. """
+        return self.element.close(node)
@@ -11,9 +11,12 @@ See: <http://stackoverflow.com/a/9109157/788553>
 
 """
 
+from lexor.command.lang import load_rel
 from lexor.core.parser import NodeParser
 from lexor.core.elements import DocumentType
 
+SPANS = load_rel(__file__, 'spans')
+
 
 class DocumentTypeNP(NodeParser):
     """Obtains the content enclosed within `<!doctype` and `>`. """
@@ -28,11 +31,14 @@ class DocumentTypeNP(NodeParser):
             return None
         index = parser.text.find('>', caret+10)
         if index == -1:
-            self.msg('E100', parser.pos)
+            if parser.partial:
+                parser.need_input()
+            if parser.messages.accept(self, 'E100'):
+                self.msg('E100', parser.pos)
             parser.update(parser.end)
-            return DocumentType(parser.text[caret+10:parser.end])
+            return SPANS.make(parser, DocumentType, caret+10, parser.end)
         parser.update(index+1)
-        return DocumentType(parser.text[caret+10:index])
+        return SPANS.make(parser, DocumentType, caret+10, index)
 
 
 MSG = {
@@ -6,16 +6,42 @@ Handles all `Elements` in the form
         ...
     </tagname>
 
+When the parser option `lazy_attributes` is set to `'true'` the
+elements only remember where their attributes are written. The
+attributes are read the first time they are accessed or when the
+`validate` method of the element is called.
+
+The event mode of the `events` module does not build elements. The
+node parser returns a `Tag` instead, which only stores the name and
+the location of the attributes.
+
+The elements in progress are indexed by name in an `OpenElements`
+object. When the caret reaches a tag, the tag is read once and the
+index gives the element it closes, an ancestor with the same name for
+an end tag or one of the elements of `AUTO_CLOSE` and
+`AUTO_CLOSE_FIRST` for an opening tag. Only that element is asked to
+close instead of every element in progress, see `ElementNP.closing`.
+
 """
 
 import re
-from lexor.core.parser import NodeParser
+from lexor.command.lang import load_rel
+from lexor.core.parser import NodeParser, Parser
 from lexor.core.elements import Element, Void, RawText
+from lexor.util import Position
+
+SPANS = load_rel(__file__, 'spans')
 
 
 RE = re.compile(r'.*?[ \t\n\r\f\v/>]')
-RE_NOSPACE = re.compile(r"\s*")
-RE_NEXT = re.compile(r'.*?[ \t\n\r\f\v/>=]')
+RE_ATTRIBUTE = re.compile(
+    r'[ \t\n\r\f\v]*'
+    r'(?P<name>[^ \t\n\r\f\v/>=]*)'
+    r'(?P<gap>[ \t\n\r\f\v]*)'
+    r'(?:=[ \t\n\r\f\v]*'
+    r'(?P<value>"[^"]*"?|\'[^\']*\'?|[^ \t\n\r\f\v/>]*))?'
+)
+RE_UNQUOTED = re.compile('[\'"=]')
 VOID_ELEMENT = (
     'area', 'base', 'basefont', 'br', 'col', 'frame', 'hr', 'img',
     'input', 'isindex', 'link', 'meta', 'param', 'command', 'embed',
@@ -24,37 +50,258 @@ VOID_ELEMENT = (
 RAWTEXT_ELEMENT = (
     'script', 'style', 'textarea', 'title'
 )
+RE_RAWTEXT_CLOSE = dict(
+    (name, re.compile(r'</%s[ \t\n\r\f\v]*>' % name, re.IGNORECASE))
+    for name in RAWTEXT_ELEMENT
+)
 AUTO_CLOSE = {
-    'p': [
+    'p': frozenset([
         'address', 'article', 'aside', 'blockquote', 'dir', 'div',
         'dl', 'fieldset', 'footer', 'form', 'h1', 'h2', 'h3', 'h4',
         'h5', 'h6', 'header', 'hgroup', 'hr', 'main', 'menu', 'nav',
         'ol', 'p', 'pre', 'section', 'table', 'ul'
-    ],
-    'a': [
+    ]),
+    'a': frozenset([
         'a'
-    ],
+    ]),
 }
 AUTO_CLOSE_FIRST = {
-    'li': ['li'],
-    'dt': ['dt', 'dd'],
-    'dd': ['dt', 'dd'],
-    'rt': ['rt', 'rp'],
-    'rp': ['rt', 'rp'],
-    'optgroup': ['optgroup'],
-    'option': ['optgroup', 'option'],
-    'thead': ['tbody', 'tfoot'],
-    'tbody': ['tbody', 'tfoot'],
-    'tfoot': ['tbody'],
-    'tr': ['tr'],
-    'td': ['td', 'th'],
-    'th': ['td', 'th'],
+    'li': frozenset(['li']),
+    'dt': frozenset(['dt', 'dd']),
+    'dd': frozenset(['dt', 'dd']),
+    'rt': frozenset(['rt', 'rp']),
+    'rp': frozenset(['rt', 'rp']),
+    'optgroup': frozenset(['optgroup']),
+    'option': frozenset(['optgroup', 'option']),
+    'thead': frozenset(['tbody', 'tfoot']),
+    'tbody': frozenset(['tbody', 'tfoot']),
+    'tfoot': frozenset(['tbody']),
+    'tr': frozenset(['tr']),
+    'td': frozenset(['td', 'th']),
+    'th': frozenset(['td', 'th']),
 }
+# For each name the elements of `AUTO_CLOSE` closed by its opening tag.
+CLOSED_BY = dict(
+    (tag, tuple(name for name in AUTO_CLOSE if tag in AUTO_CLOSE[name]))
+    for tag in frozenset().union(*AUTO_CLOSE.values())
+)
+
+# Kinds of tags returned by `ElementNP.read_tag`.
+START = 1
+END = 2
+INCOMPLETE = 3
+NO_TAG = (None, None, None)
+
+
+class LazyAttributes(object):
+    """Mixin for elements whose attributes are read from the text
+    only when they are needed. The methods of `Element` are called
+    directly instead of through `super` since the module is executed
+    again each time a parser loads the style, which replaces this
+    class while the elements of other parsers still use the old one.
+    """
+
+    lazy_ = None
+
+    @property
+    def _order(self):
+        """The attribute names. Reading them forces the attributes to
+        be parsed. """
+        if self.lazy_ is not None:
+            self.validate()
+        return self.__dict__['_order']
+
+    @_order.setter
+    def _order(self, value):
+        """Setter function for _order. """
+        self.__dict__['_order'] = value
+
+    def validate(self):
+        """Parse the attributes if they have not been read. Messages
+        are sent to the log of the parse that created the element. """
+        if self.lazy_ is None:
+            return
+        reader, start, end = self.lazy_
+        self.lazy_ = None
+        reader.read(self, start, end)
+
+    def is_absent(self, name):
+        """Return True if the attribute `name` cannot possibly be
+        declared in the text of the unread attributes. """
+        reader, start, end = self.lazy_
+        return name and reader.text.find(name, start, end) == -1
+
+    def __getitem__(self, k):
+        if self.lazy_ is not None and isinstance(k, str):
+            if self.is_absent(k):
+                raise KeyError(k)
+            self.validate()
+        return Element.__getitem__(self, k)
+
+    def get(self, k, val=''):
+        if self.lazy_ is not None:
+            if self.is_absent(k):
+                return val
+            self.validate()
+        return Element.get(self, k, val)
+
+    def __contains__(self, obj):
+        if self.lazy_ is not None and isinstance(obj, str):
+            if self.is_absent(obj):
+                return False
+            self.validate()
+        return Element.__contains__(self, obj)
+
+    def __setitem__(self, k, val):
+        if self.lazy_ is not None and isinstance(k, str):
+            self.validate()
+        Element.__setitem__(self, k, val)
+
+    def __delitem__(self, k):
+        if self.lazy_ is not None and isinstance(k, str):
+            self.validate()
+        Element.__delitem__(self, k)
+
+
+class LazyElement(LazyAttributes, Element):
+    """`Element` with lazy attributes. """
+    pass
+
+
+class LazyVoid(LazyAttributes, Void):
+    """`Void` with lazy attributes. """
+    pass
+
+
+class LazyRawText(LazyAttributes, RawText):
+    """`RawText` with lazy attributes. """
+    pass
+
+
+class Tag(object):
+    """Stands for an element in the event mode. The attributes are
+    read only when `attributes` is called. """
+
+    __slots__ = ('name', 'lazy_', 'has_element_', 'pos', 'data', '_items')
+
+    def __init__(self, name):
+        self.name = name
+        self.lazy_ = None
+        self.has_element_ = None
+        self.pos = None
+        self.data = None
+        self._items = None
+
+    @property
+    def node_position(self):
+        """Elements do not have a node position. """
+        return 0, 0
+
+    @property
+    def span(self):
+        """The indices `(start, end)` of the text declaring the
+        attributes or None if there is no such text. """
+        if self.lazy_ is None:
+            return None
+        return self.lazy_[1], self.lazy_[2]
+
+    def attributes(self):
+        """Return a list of `(name, value)` pairs. """
+        if self._items is None:
+            element = Element(self.name)
+            if self.lazy_ is not None:
+                reader, start, end = self.lazy_
+                reader.read(element, start, end)
+            self._items = element.items()
+        return self._items
+
+
+class OpenElements(object):
+    """The elements in progress of a parse with the positions of each
+    name, so that the innermost element with a given name is found
+    without looking at the others. """
+
+    def __init__(self):
+        self.nodes = []
+        self.index = dict()
+
+    def sync(self, in_progress):
+        """Update the index with the pairs `(node, processor)` in the
+        list `in_progress` of the parser. Between two calls elements
+        are only added and removed at the end of the list. """
+        nodes = self.nodes
+        num = min(len(nodes), len(in_progress))
+        if num and nodes[num-1] is not in_progress[num-1][0]:
+            num = 0
+        while len(nodes) > num:
+            self.index[nodes.pop().name].pop()
+        for num in range(num, len(in_progress)):
+            node = in_progress[num][0]
+            self.index.setdefault(node.name, []).append(num)
+            nodes.append(node)
+
+    def innermost(self, name):
+        """Return the position of the innermost element named `name`
+        or -1 if there is none. """
+        positions = self.index.get(name)
+        if positions:
+            return positions[-1]
+        return -1
+
+
+class AttributeReader(Parser):
+    """Holds the text and log of a parse so that lazy elements may
+    read their attributes after the parser has moved on. """
+
+    def __init__(self, parser):
+        Parser.__init__(self, parser.language, parser.parsing_style)
+        self.text = parser.text
+        self.end = parser.end
+        self.log = parser.log
+        self._uri = parser.uri
+        self.lines = parser.lines
+        self.messages = parser.messages
+        self.node_parser = ElementNP(self)
+
+    def read(self, node, start, end):
+        """Read the attributes in `text[start:end]` into `node`. """
+        self.caret = start
+        self.pos = self.lines.position(start)
+        self.node_parser.read_attributes(self, node, end, node.name)
 
 
 class ElementNP(NodeParser):
     """Parses all html elements. """
 
+    def __init__(self, parser):
+        NodeParser.__init__(self, parser)
+        self.lazy = True
+        if getattr(parser, 'tag_events', False):
+            self.classes = (Tag, Tag, Tag)
+        elif parser.defaults.get('lazy_attributes') == 'true':
+            self.classes = (LazyVoid, LazyRawText, LazyElement)
+        else:
+            self.classes = (Void, RawText, Element)
+            self.lazy = False
+        self.spans = parser.defaults.get('text_spans') == 'true'
+        if self.spans and self.classes[1] is not Tag:
+            self.classes = (
+                self.classes[0],
+                SPANS.span_class(self.classes[1]),
+                self.classes[2]
+            )
+        else:
+            self.spans = False
+        self.reader = None
+        self.open = OpenElements()
+        self.tag = (None, -1, NO_TAG)
+
+    def get_reader(self, parser):
+        """Return the `AttributeReader` for the current parse. """
+        if self.reader is None or self.reader.log is not parser.log:
+            self.reader = AttributeReader(parser)
+        return self.reader
+
     def is_element(self, parser):
         """Check to see if the parser's caret is positioned in an
         element and return the index where the opening tag ends. """
@@ -63,34 +310,35 @@ class ElementNP(NodeParser):
             return None
         char = parser.text[caret+1:caret+2]
         if char.isalpha() or char in [":", "_"]:
-            endindex = parser.text.find('>', caret+1)
+            endindex = parser.boundary.find('>', caret+1)
             if endindex == -1:
+                if parser.partial:
+                    parser.need_input()
                 return None
-            start = parser.text.find('<', caret+1)
+            start = parser.boundary.find('<', caret+1)
             if start != -1 and start < endindex:
-                self.msg('E100', parser.pos, parser.compute(start))
+                if parser.messages.accept(self, 'E100'):
+                    self.msg('E100', parser.pos, parser.lines.position(start))
                 return None
         else:
             return None
         return endindex
 
-    def get_raw_text(self, parser, tagname, pos):
-        """Return the data content of the RawText object and update
-        the caret. """
-        index = parser.text.find('<', parser.caret)
-        while index != -1:
-            tmpstr = parser.text[index:index+len(tagname)+3].lower()
-            if tmpstr == '</%s>' % tagname:
-                break
-            index = parser.text.find('<', index+1)
-        if index == -1:
-            self.msg('E110', pos, [tagname])
-            content = parser.text[parser.caret:]
+    def find_raw_text(self, parser, tagname, start):
+        """Return the indices where the data content of the RawText
+        object starts and ends and update the caret. The closing tag
+        may contain spaces before `>`. """
+        caret = parser.caret
+        match = RE_RAWTEXT_CLOSE[tagname].search(parser.text, caret)
+        if match is None:
+            if parser.partial:
+                parser.need_input()
+            if parser.messages.accept(self, 'E110'):
+                self.msg('E110', parser.lines.position(start), [tagname])
             parser.update(parser.end)
-        else:
-            content = parser.text[parser.caret:index]
-            parser.update(index+len(tagname)+3)
-        return content
+            return caret, parser.end
+        parser.update(match.end(0))
+        return caret, match.start(0)
 
     def make_node(self):
         parser = self.parser
@@ -98,149 +346,206 @@ class ElementNP(NodeParser):
         endindex = self.is_element(parser)
         if endindex is None:
             return None
-        pos = parser.copy_pos()
         match = RE.search(parser.text, caret+1)
         tagname = parser.text[parser.caret+1:match.end(0)-1].lower()
         if tagname in VOID_ELEMENT:
-            node = Void(tagname)
+            kind = 0
         elif tagname in RAWTEXT_ELEMENT:
-            node = RawText(tagname)
+            kind = 1
         else:
-            node = Element(tagname)
+            kind = 2
+        node = self.classes[kind](tagname)
+        if kind == 2:
+            node.has_element_ = False
+        parser.current_node.has_element_ = True
         parser.update(match.end(0)-1)
         if parser.text[parser.caret] is '>':
             parser.update(parser.caret+1)
         elif parser.text[parser.caret] is '/':
             parser.update(endindex+1)
+        elif self.lazy:
+            node.lazy_ = (self.get_reader(parser), parser.caret, endindex)
+            parser.update(endindex+1)
         else:
             self.read_attributes(parser, node, endindex, tagname)
-        if isinstance(node, Void):
+        if kind == 0:
             return [node]
-        if isinstance(node, RawText):
-            node.data = self.get_raw_text(parser, tagname, pos)
+        if kind == 1:
+            start, end = self.find_raw_text(parser, tagname, caret)
+            if self.spans:
+                SPANS.set_span(parser, node, start, end)
+            else:
+                node.data = parser.text[start:end]
             return [node]
-        node.pos = pos
+        node.pos = parser.lines.locate(caret)
         return node
 
+    def read_tag(self, parser):
+        """Return a tuple `(kind, name, end)` describing the tag at the
+        caret, `kind` is `START`, `END`, `INCOMPLETE` if the tag has no
+        `>` or None if there is no tag. `end` is the index of the `>`
+        of an end tag. The tag is only read once for each caret. """
+        text = parser.text
+        caret = parser.caret
+        if self.tag[0] is text and self.tag[1] == caret:
+            return self.tag[2]
+        tag = NO_TAG
+        if text[caret:caret+1] == '<':
+            char = text[caret+1:caret+2]
+            if char == '/':
+                index = parser.boundary.find('>', caret+2)
+                if index == -1:
+                    tag = (INCOMPLETE, None, None)
+                else:
+                    tag = (END, text[caret+2:index].lower(), index)
+            elif char.isalpha() or char in [":", "_"]:
+                index = parser.boundary.find('>', caret+1)
+                start = parser.boundary.find('<', caret+1)
+                if index == -1:
+                    tag = (INCOMPLETE, None, None)
+                elif start == -1 or start > index:
+                    match = RE.search(text, caret+1)
+                    tag = (START, text[caret+1:match.end(0)-1].lower(),
+                           None)
+        self.tag = (text, caret, tag)
+        return tag
+
     def close(self, node):
         """Return the position where the element was closed. """
         parser = self.parser
-        caret = parser.caret
-        flag = None
-        if parser.text[caret:caret+1] != '<':
-            pass
-        elif parser.text[caret+1:caret+2] == '/':
-            index = parser.text.find('>', caret+2)
-            if index == -1:
-                return None
-            tmptag = parser.text[caret+2:index].lower()
+        kind, tmptag, index = self.read_tag(parser)
+        if kind is None:
+            return None
+        if kind == INCOMPLETE:
+            if parser.partial:
+                parser.need_input()
+            return None
+        if kind == END:
             if node.name == tmptag:
                 pos = parser.copy_pos()
                 parser.update(index+1)
                 return pos
-        else:
-            flag = self.is_element(parser)
-        if flag is None:
             return None
         # http://www.whatwg.org/specs/web-apps/current-work/#optional-tags
-        match = RE.search(parser.text, caret+1)
-        tmptag = parser.text[parser.caret+1:match.end(0)-1].lower()
-        if node.name in AUTO_CLOSE and tmptag in AUTO_CLOSE[node.name]:
+        names = AUTO_CLOSE.get(node.name)
+        if names is not None and tmptag in names:
+            pos = parser.copy_pos()
+            return pos
+        # `has_element_` is set by `make_node` when a child is created
+        names = AUTO_CLOSE_FIRST.get(node.name)
+        if names is not None and not node.has_element_ and tmptag in names:
             pos = parser.copy_pos()
             return pos
-        if node.name in AUTO_CLOSE_FIRST:
-            has_element = False
-            for child in node.child:
-                if isinstance(child, Element):
-                    has_element = True
-                    break
-            if has_element is False and tmptag in AUTO_CLOSE_FIRST[node.name]:
-                pos = parser.copy_pos()
-                return pos
         return None
 
+    def closing(self, in_progress):
+        """Return the index in the list `in_progress` of the parser of
+        the element closed at the caret and the position returned by
+        its `close`, or None. Only an element with a child element can
+        be in progress inside another one, so `AUTO_CLOSE_FIRST` only
+        applies to the last element. """
+        if not in_progress:
+            return None
+        kind, name, _ = self.read_tag(self.parser)
+        if kind is None:
+            return None
+        num = len(in_progress) - 1
+        if kind == END:
+            self.open.sync(in_progress)
+            num = self.open.innermost(name)
+        elif kind == START:
+            node = in_progress[num][0]
+            names = AUTO_CLOSE_FIRST.get(node.name)
+            if node.has_element_ or names is None or name not in names:
+                self.open.sync(in_progress)
+                num = -1
+                for item in CLOSED_BY.get(name, ()):
+                    num = max(num, self.open.innermost(item))
+        if num == -1:
+            return None
+        node, processor = in_progress[num]
+        pos = processor.close(node)
+        if pos is None:
+            return None
+        return num, pos
+
+    def close_node(self):
+        """Replaces `Parser._close_node` so that the elements in
+        progress are closed with `closing`. """
+        # pylint: disable=protected-access
+        parser = self.parser
+        in_progress = parser._in_progress
+        found = self.closing(in_progress)
+        if found is None:
+            return None
+        num, autoclose = found
+        for i in range(len(in_progress)-1, num, -1):
+            node = in_progress[i][0]
+            parser.msg(
+                parser.__module__, 'W100',
+                node.node_position,
+                (node.name, Position(autoclose))
+            )
+            del in_progress[i]
+        del in_progress[num]
+        if in_progress:
+            return in_progress[-1][0]
+        return parser.doc
+
     def is_empty(self, parser, index, end, tagname):
         """Checks to see if the parser has reached '/'. """
         if parser.text[index] == '/':
             parser.update(end+1)
             if end - index > 1:
-                self.msg('E120', parser.compute(index))
+                if parser.messages.accept(self, 'E120'):
+                    self.msg('E120', parser.lines.position(index))
             if tagname not in VOID_ELEMENT:
-                self.msg('E121', parser.compute(index))
+                if parser.messages.accept(self, 'E121'):
+                    self.msg('E121', parser.lines.position(index))
             return True
         return False
 
-    def read_prop(self, parser, node, end, tagname):
-        """Return [prop, prop_index, implied, empty]. """
-        prop = None
-        prop_index = None
-        match = RE_NOSPACE.search(parser.text, parser.caret, end)
-        if self.is_empty(parser, match.end(0), end, tagname):
-            return prop, prop_index, False, True
-        if parser.text[match.end(0)] == '>':
-            parser.update(end+1)
-            return prop, prop_index, False, False
-        prop_index = match.end(0)
-        if prop_index - parser.caret == 0 and node.attlen > 0:
-            self.msg('E130', parser.pos)
-        match = RE_NEXT.search(parser.text, prop_index, end)
-        if match is None:
-            prop = parser.text[prop_index:end]
-            parser.update(end+1)
-            return prop, prop_index, True, False
-        prop = parser.text[prop_index:match.end(0)-1]
-        if self.is_empty(parser, match.end(0)-1, end, tagname):
-            return prop, prop_index, True, True
-        if parser.text[match.end(0)-1] == '=':
-            parser.update(match.end(0))
-            return prop, prop_index, False, False
-        match = RE_NOSPACE.search(parser.text, match.end(0), end)
-        if parser.text[match.end(0)] == '=':
-            implied = False
-            parser.update(match.end(0)+1)
-        else:
-            implied = True
-            parser.update(match.end(0)-1)
-        return prop, prop_index, implied, False
-
-    def read_val(self, parser, end, tagname):
-        """Return the attribute value. """
-        match = RE_NOSPACE.search(parser.text, parser.caret, end)
-        if self.is_empty(parser, match.end(0), end, tagname):
+    def check_unquoted(self, parser, start, val):
+        """Issue a message for each quote or equal sign found in an
+        unquoted attribute value. The messages are placed at `start`.
+        """
+        if RE_UNQUOTED.search(val) is None:
+            return
+        for item in '\'"=':
+            if item in val and parser.messages.accept(self, 'E140'):
+                self.msg('E140', parser.lines.position(start), [item])
+
+    def read_val(self, parser, match, end, tagname):
+        """Return the attribute value given the `match` obtained from
+        `RE_ATTRIBUTE`. The caret must be positioned after `=`. """
+        text = parser.text
+        val_index, val_end = match.span('value')
+        if self.is_empty(parser, val_index, end, tagname):
             return ''
-        if parser.text[match.end(0)] == '>':
+        if val_index == end:
             parser.update(end+1)
             return ''
-        val_index = match.end(0)
-        if parser.text[val_index] in ["'", '"']:
-            quote = parser.text[val_index]
-            index = parser.text.find(quote, val_index+1, end)
-            if index == -1:
-                self.msg('E150', parser.pos, parser.compute(end))
-                parser.update(end+1)
-                return parser.text[val_index+1:end]
-            parser.update(index+1)
-            return parser.text[val_index+1:index]
-        else:
-            pos = parser.copy_pos()
-            match = RE.search(parser.text, val_index, end)
-            if match is None:
-                val = parser.text[val_index:end]
-                for item in '\'"=':
-                    if item in val:
-                        self.msg('E140', pos, [item])
-                parser.update(end+1)
-                return val
-            if parser.text[match.end(0)-1] == '/':
-                self.msg('E141', pos)
-                parser.update(match.end(0)-1)
-            else:
-                parser.update(match.end(0)-1)
-            val = parser.text[val_index:match.end(0)-1]
-            for item in '\'"=':
-                if item in val:
-                    self.msg('E140', pos, [item])
+        quote = text[val_index]
+        if quote in '\'"':
+            if val_end - val_index > 1 and text[val_end-1] == quote:
+                parser.update(val_end)
+                return text[val_index+1:val_end-1]
+            if parser.messages.accept(self, 'E150'):
+                self.msg('E150', parser.pos, parser.lines.position(end))
+            parser.update(end+1)
+            return text[val_index+1:end]
+        start = parser.caret
+        val = text[val_index:val_end]
+        if val_end == end:
+            self.check_unquoted(parser, start, val)
+            parser.update(end+1)
             return val
+        if text[val_end] == '/':
+            if parser.messages.accept(self, 'E141'):
+                self.msg('E141', parser.pos)
+        parser.update(val_end)
+        self.check_unquoted(parser, start, val)
+        return val
 
     def read_attributes(self, parser, node, end, tname):
         """Parses the string
@@ -251,22 +556,47 @@ class ElementNP(NodeParser):
 
             att1="val1" att2="val2" ...
 
-        This function returns True if the opening tag ends with `/`. """
+        Each attribute is recognized by a single match of
+        `RE_ATTRIBUTE` which provides the spans of the name and the
+        value. This function returns True if the opening tag ends
+        with `/`. """
+        text = parser.text
         while parser.caret < end:
-            prop, prop_index, implied, empty = self.read_prop(
-                parser, node, end, tname
-            )
-            if prop is None:
-                return empty
+            match = RE_ATTRIBUTE.match(text, parser.caret, end)
+            prop_index, prop_end = match.span('name')
+            char = text[prop_index]
+            if char == '/':
+                return self.is_empty(parser, prop_index, end, tname)
+            if char == '>':
+                parser.update(end+1)
+                return False
+            if prop_index == parser.caret and node.attlen > 0:
+                if parser.messages.accept(self, 'E130'):
+                    self.msg('E130', parser.pos)
+            prop = text[prop_index:prop_end]
+            empty = False
+            if prop_end == end:
+                implied = True
+                parser.update(end+1)
+            elif text[prop_end] == '/':
+                implied = empty = True
+                self.is_empty(parser, prop_end, end, tname)
+            elif match.start('value') == -1:
+                implied = True
+                parser.update(match.end('gap')-1)
+            else:
+                implied = False
+                parser.update(match.end('gap')+1)
             if prop in node:
-                self.msg('E160', parser.compute(prop_index), [prop])
+                if parser.messages.accept(self, 'E160'):
+                    pos = parser.lines.position(prop_index)
+                    self.msg('E160', pos, [prop])
             if implied is True:
                 node[prop] = ""
                 if empty is True:
                     return empty
             else:
-                val = self.read_val(parser, end, tname)
-                node[prop] = val
+                node[prop] = self.read_val(parser, match, end, tname)
         parser.update(end+1)
 
 
@@ -295,9 +625,9 @@ MSG_EXPLANATION = [
       tag is found. Make sure to provide its proper closing tag.
 
     Okay: <title>My awesome website</title>
+    Okay: <title>My awesome website</TITLE >
     Okay: <script>a < b && b > c</script>
 
-    E110: <title>My sheetie website</title >
     E110: <title>My sheetie website< / title >
     E110: <title>My sheetie website
     E110: <script>a < b && b > c
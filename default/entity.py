@@ -4,13 +4,27 @@ Some characters are reserved in HTML: `<` and `&`. To be able
 to display them we need to use HTML entities. The parser defined
 in this module looks for such entities.
 
+Named entities are only recognized if they are defined in HTML5, see
+the `entities` module. Numeric entities may be written in decimal,
+`&#169;`, or hexadecimal, `&#xA9;`. The patterns used to find them
+are bounded by the longest possible entity so the text following `&`
+is never scanned any further.
+
 """
 
 import re
+from lexor.command.lang import load_rel
 from lexor.core.parser import NodeParser
 from lexor.core.elements import Entity, Text
 
-RE = re.compile('.*?[ \t\n\r\f\v;]')
+ENTITIES = load_rel(__file__, 'entities')
+NAMED_ENTITY = ENTITIES.NAMED_ENTITY
+RE_NAMED = re.compile(
+    '&([A-Za-z][A-Za-z0-9]{0,%d});' % (ENTITIES.MAX_LENGTH - 1)
+)
+RE_NUMERIC = re.compile('&#(?:[0-9]{1,7}|[xX][0-9a-fA-F]{1,6});')
+# Length of the longest text that may be matched by the patterns
+MAX_LENGTH = ENTITIES.MAX_LENGTH + 2
 
 
 class EntityNP(NodeParser):
@@ -21,30 +35,39 @@ class EntityNP(NodeParser):
     def _handle_lt(self, parser, caret):
         """Helper function for make_node. """
         if parser.text[caret+1:caret+2] == '/':
-            tmp = parser.text.find('>', caret+2)
+            tmp = parser.boundary.find('>', caret+2)
             if tmp == -1:
-                self.msg('E100', parser.pos, ['<'])
+                if parser.partial:
+                    parser.need_input()
+                if parser.messages.accept(self, 'E100'):
+                    self.msg('E100', parser.pos, ['<'])
                 parser.update(caret+1)
                 return Entity('&lt;')
             else:
-                stray_endtag = parser.text[caret:tmp+1]
-                self.msg('E101', parser.pos, [stray_endtag])
+                if parser.messages.accept(self, 'E101'):
+                    stray_endtag = parser.text[caret:tmp+1]
+                    self.msg('E101', parser.pos, [stray_endtag])
                 parser.update(tmp+1)
                 return Text('')
         else:
-            self.msg('E100', parser.pos, ['<'])
+            if parser.messages.accept(self, 'E100'):
+                self.msg('E100', parser.pos, ['<'])
             parser.update(caret+1)
             return Entity('&lt;')
 
     def _handle_amp(self, parser, caret):
         """Helper function for make_node. """
-        match = RE.search(parser.text, caret)
-        if not match:
-            self.msg('E100', parser.pos, ['&'])
-            parser.update(caret+1)
-            return Entity('&amp;')
-        if parser.text[match.end()-1] != ';':
-            self.msg('E100', parser.pos, ['&'])
+        if parser.text[caret+1:caret+2] == '#':
+            match = RE_NUMERIC.match(parser.text, caret)
+        else:
+            match = RE_NAMED.match(parser.text, caret)
+            if match and match.group(1) not in NAMED_ENTITY:
+                match = None
+        if match is None:
+            if parser.partial and parser.end - caret <= MAX_LENGTH:
+                parser.need_input()
+            if parser.messages.accept(self, 'E100'):
+                self.msg('E100', parser.pos, ['&'])
             parser.update(caret+1)
             return Entity('&amp;')
         parser.update(match.end())
@@ -70,11 +93,17 @@ MSG_EXPLANATION = [
       display `<` you must write the entity `&lt;` or `&#60;`. To
       write `&` you can use the entity `&amp;`
 
+    - Named entities must be defined in HTML5 and they must be
+      terminated by `;`.
+
     Okay: a &lt; b
     Okay: I like M&amp;Ms
+    Okay: &copy; &#169; &#xA9;
 
     E100: a < b
     E100: I like M&Ms
+    E100: I like M&Ms;
+    E100: &#xZZ; &#;
 """,
     """
     - Stray end tags are usually an indication of an error. The short
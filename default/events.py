@@ -0,0 +1,243 @@
+"""HTML: EVENT parser
+
+The `EventParser` recognizes the same nodes as the `default` style
+but instead of building a document it generates events. This is
+useful when only the text or a few attributes are needed since the
+elements are never created and no node is attached to another. Only
+the elements are avoided: the other node parsers still create their
+`Text`, `Entity`, `Comment`, `CData`, `DocumentType` or
+`ProcessingInstruction` node, which is turned into an event and
+dropped.
+
+    parser = EventParser()
+    for event, value in parser.events(text):
+        ...
+
+The events and their values are
+
+    start       Tag
+    end         Tag
+    text        string
+    comment     string
+    cdata       string
+    doctype     string
+    pi          (target, string)
+    entity      string
+
+A `Tag`, see the `element` module, has the `name` of the element and
+the `span` of the text declaring its attributes. The attributes are
+read by calling its `attributes` method, only then are the messages
+about the attributes sent to the log. Void elements and elements
+whose content is raw text generate a `start` event followed by an
+`end` event, the raw text is stored in the `data` of the tag.
+
+The `end` events include the elements closed automatically and the
+elements that are not closed by the end of the text. Consecutive
+text is reported in a single event just like the `Text` nodes of the
+document are merged.
+
+While an event is handled the attribute `span` of the parser holds
+the indices `(start, end)` of the text which produced it. The end
+tag of an element which is closed implicitly has an empty span.
+
+A part of the text may be parsed by giving the index where the parse
+starts and the index where it stops. The parse stops before the first
+node which starts at or after `stop`, a text which goes on after it
+is reported in two events. The elements which contain the starting
+point are given as pairs `(name, has_element)`, the second value
+tells whether the element already has an element child. When the
+parse stops early the tags of the elements still open are left in
+`open_tags` and no `end` events are generated for them.
+
+"""
+
+from lexor.command.lang import map_explanations
+from lexor.core.parser import Parser
+from lexor.core.elements import Document, Text, CharacterData, \
+    Entity, Comment, CData, DocumentType, ProcessingInstruction
+from lexor.util import Position
+
+# The parser reports the nodes it cannot close with the name of the
+# module of its class.
+from lexor.core.parser import MSG, MSG_EXPLANATION
+
+EVENT = (
+    (Entity, 'entity'),
+    (Comment, 'comment'),
+    (CData, 'cdata'),
+    (DocumentType, 'doctype'),
+)
+
+
+class EventParser(Parser):
+    """Generates the events of an html document parsed with the
+    `default` style. """
+
+    def __init__(self, defaults=None):
+        Parser.__init__(self, 'html', 'default', defaults)
+        self.tag_events = True
+        self.span = None
+        self._text = None
+        self._text_span = None
+        self.open_tags = None
+
+    def events(self, text, uri=None, start=0, stop=None, state=()):
+        """Parse `text` and generate tuples `(event, value)`. The
+        messages are stored in the `log` of the parser. The parse may
+        be limited to the nodes between `start` and `stop`, the
+        elements open at `start` are given in `state`. """
+        if self._reload:
+            self.load_node_parsers()
+        self.text = text
+        self.end = len(text)
+        self.pos = [1, 1]
+        self.caret = 0
+        self.doc = Document(self._lang)
+        if uri:
+            self._uri = uri
+        else:
+            self._uri = 'string@0x%x' % id(text)
+        self.log = Document("lexor", "log")
+        self.log.modules = dict()
+        self.log.explanation = dict()
+        if hasattr(self.style_module, 'pre_process'):
+            self.style_module.pre_process(self)
+        if start:
+            self.caret = start
+            self.pos = self.lines.position(start)
+        tags = list()
+        for name, flag in state:
+            tags.append(self['ElementNP'].classes[2](name))
+            tags[-1].has_element_ = flag
+        if stop is None:
+            stop = self.end
+        for event in self._parse_events(tags, stop):
+            yield event
+        if hasattr(self.style_module, 'post_process'):
+            self.style_module.post_process(self)
+        map_explanations(self.log.modules, self.log.explanation)
+
+    def _add_text(self, content, start):
+        """Collect the text found at `start`. The caret must be at the
+        end of the text. """
+        if self._text:
+            self._text_span[1] = self.caret
+        else:
+            self._text_span = [start, self.caret]
+        self._text.append(content)
+
+    def _flush(self):
+        """Return the text that has not been reported. """
+        content = ''.join(self._text)
+        self._text = []
+        self.span = tuple(self._text_span)
+        return content
+
+    def _node_event(self, node):
+        """Return the event for a node returned by a node parser. """
+        if isinstance(node, ProcessingInstruction):
+            return 'pi', (node.name, node.data)
+        for cls, event in EVENT:
+            if isinstance(node, cls):
+                return event, node.data
+        raise TypeError('unexpected node %r' % node)
+
+    def _close_events(self):
+        """Checks and closes a tag that is in self._in_progress. This
+        follows `ElementNP.close_node` and returns the list of closed
+        tags or None. """
+        found = self['ElementNP'].closing(self._in_progress)
+        if found is None:
+            return None
+        num, autoclose = found
+        closed = list()
+        for i in range(len(self._in_progress)-1, num, -1):
+            node = self._in_progress[i][0]
+            self.msg(
+                self.__module__, 'W100',
+                node.node_position,
+                (node.name, Position(autoclose))
+            )
+            closed.append(node)
+            del self._in_progress[i]
+        closed.append(self._in_progress[num][0])
+        del self._in_progress[num]
+        return closed
+
+    def _parse_events(self, tags, stop):
+        """Main loop of `events`. It follows `Parser._parse` but the
+        nodes are turned into events. """
+        dispatch = self['DispatchNP']
+        self._in_progress = [(tag, dispatch) for tag in tags]
+        self.current_node = crt = tags[-1] if tags else self.doc
+        self.open_tags = None
+        self._text = []
+        while self.caret < stop:
+            start = self.caret
+            closed = self._close_events()
+            if closed is not None:
+                if self._text:
+                    yield 'text', self._flush()
+                self.span = (start, start)
+                for node in closed[:-1]:
+                    yield 'end', node
+                self.span = (start, self.caret)
+                yield 'end', closed[-1]
+                if self._in_progress:
+                    self.current_node = crt = self._in_progress[-1][0]
+                else:
+                    self.current_node = crt = self.doc
+                continue
+            node = None
+            processor = None
+            for processor in self._get_np(crt):
+                node = processor.make_node()
+                if node is not None:
+                    break
+                elif self.caret == self.end:
+                    break
+            if node is None:
+                self._process_text_event(crt)
+            elif isinstance(node, Text):
+                if node.data:
+                    self._add_text(node.data, start)
+            else:
+                if self._text:
+                    yield 'text', self._flush()
+                self.span = (start, self.caret)
+                if isinstance(node, list):
+                    yield 'start', node[0]
+                    self.span = (self.caret, self.caret)
+                    yield 'end', node[0]
+                elif isinstance(node, CharacterData):
+                    yield self._node_event(node)
+                else:
+                    yield 'start', node
+                    self._in_progress.append((node, processor))
+                    self.current_node = crt = node
+        if self._text:
+            yield 'text', self._flush()
+        if self.caret < self.end:
+            self.open_tags = [node for node, _ in self._in_progress]
+            self._in_progress = []
+            return
+        for node, processor in self._in_progress:
+            node_pos = node.node_position
+            self.msg(self.__module__, 'E100', node_pos, [node.name])
+        self.span = (self.end, self.end)
+        for node, processor in reversed(self._in_progress):
+            yield 'end', node
+
+    def _process_text_event(self, crt):
+        """Same as `Parser._process_text` but the text is collected
+        instead of being appended to `crt`. """
+        start = self.caret
+        index = self._get_next_check(crt)
+        if index == -1:
+            self.update(self.end)
+            self._add_text(self.text[start:self.end], start)
+            return
+        elif index - start == 0:
+            index += 1
+        self.update(index)
+        self._add_text(self.text[start:index], start)
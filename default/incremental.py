@@ -0,0 +1,463 @@
+"""HTML: INCREMENTAL parser
+
+The `IncrementalParser` parses a document as usual and remembers the
+span of the text which produced each node. After the text is edited
+only the part of the document around the edit is parsed again:
+
+    parser = IncrementalParser()
+    doc = parser.parse(text)
+    parser.edit(offset, removed, inserted)
+
+`edit` replaces `removed` characters at `offset` with the string
+`inserted` and updates the document in place. The parser looks for
+the smallest element whose content contains the edit and runs the
+node parsers on its children, starting a few nodes before the edit
+since the node parsers may look past the end of a node. As soon as
+the parse reaches, in the same state, the start of one of the
+children which followed the edit the rest of the children are kept.
+If the element is closed too early, or if its content ends while the
+new nodes are still open, the parent of the element is tried.
+
+The nodes which are kept are not visited. Their spans are shifted
+when they are requested with `span`, each edit is remembered for
+this purpose. The method `position` gives the current line and
+column of a node, the `node_position` of the nodes which were kept is
+the one they had when they were parsed. The messages in the log are
+shifted when the document is edited. The line index of the parser is
+updated by each edit, only the inserted text is searched for new
+lines.
+
+The option `lazy_attributes` is ignored, the attributes are read
+when an element is created since the text of the element may change
+before they are requested.
+
+"""
+
+from lexor.command.lang import map_explanations
+from lexor.core.parser import Parser
+from lexor.core.elements import Element, RawText, Text
+from lexor.util import Position
+
+# The parser reports the nodes it cannot close with the name of the
+# module of its class.
+from lexor.core.parser import MSG, MSG_EXPLANATION
+
+# Number of characters the node parsers may read past the end of a
+# node without finding a `>`. The longest entity name fits in it.
+LOOKAHEAD = 64
+
+
+class IncrementalParser(Parser):
+    """Parses html with the `default` style and updates the document
+    when the text is edited. """
+
+    def __init__(self, defaults=None):
+        defaults = dict(defaults or ())
+        defaults['lazy_attributes'] = 'false'
+        Parser.__init__(self, 'html', 'default', defaults)
+        self.spans = dict()
+        self.edits = list()
+        self._version = 0
+        self._step = 0
+        self._root = None
+        self._recorded = None
+        self._joint = None
+
+    def msg(self, mod_name, code, pos, arg=None, uri=None):
+        """Same as `Parser.msg` but the message remembers where the
+        node being parsed starts so that it can be replaced when the
+        node is parsed again. """
+        Parser.msg(self, mod_name, code, pos, arg, uri)
+        self.log.child[-1].offset_ = self._step
+        self.log.child[-1].closing_ = None
+        self.log.child[-1].final_ = False
+
+    def span(self, node):
+        """Return the indices `(start, content_start, content_end,
+        end)` of the text which produced a node. The content indices
+        of the nodes which are not elements are the same as the
+        others. """
+        key = id(node)
+        entry = self.spans[key]
+        if entry[4] < len(self.edits):
+            for offset, end, delta, ancestors in self.edits[entry[4]:]:
+                if key in ancestors:
+                    entry[2] += delta
+                    entry[3] += delta
+                elif entry[0] >= end:
+                    entry[0] += delta
+                    entry[1] += delta
+                    entry[2] += delta
+                    entry[3] += delta
+            entry[4] = len(self.edits)
+        return tuple(entry[:4])
+
+    def position(self, node):
+        """Return the position `(line, column)` where a node starts in
+        the current text. """
+        return tuple(self.lines.position(self.span(node)[0]))
+
+    def edit(self, offset, removed, inserted):
+        """Replace `removed` characters at `offset` with the string
+        `inserted` and parse the affected nodes again. Returns the
+        updated document. """
+        end = offset + removed
+        if offset < 0 or removed < 0 or end > self.end:
+            raise ValueError('edit outside of the text')
+        delta = len(inserted) - removed
+        chain = self._locate(offset, end)
+        lines = self.lines
+        moved = [lines.position(end)]
+        messages = self.messages
+        self.text = self.text[:offset] + inserted + self.text[end:]
+        self.end = len(self.text)
+        self.pos = [1, 1]
+        self.style_module.pre_process(self)
+        self.messages = messages
+        lines.edit(offset, end, inserted, self.text)
+        self.lines = lines
+        moved.append(lines.position(end + delta))
+        self._version = len(self.edits) + 1
+        while not self._reparse(chain, offset, end, delta, moved):
+            chain.pop()
+        self.edits.append(
+            (offset, end, delta, frozenset(id(node) for node in chain))
+        )
+        map_explanations(self.log.modules, self.log.explanation)
+        return self.doc
+
+    def _parse(self):
+        """Main parsing function. It follows `Parser._parse` and
+        records the spans of the nodes. """
+        self.spans = dict()
+        self.edits = list()
+        self._version = 0
+        self._recorded = None
+        self._record(self.doc, 0, 0)
+        self._root = self.doc
+        self._in_progress = []
+        self._run(self.doc, 0, None)
+        self._finish()
+        self._close_span(self.doc, self.end, self.end)
+
+    def _record(self, node, start, end):
+        """Store the span of a node. The content of an element starts
+        at `end`, the end of its content is set when it is closed. """
+        key = id(node)
+        pos = getattr(node, 'pos', None)
+        if getattr(pos, 'offset', None) is not None:
+            # The line index is updated by `edit`, the position is
+            # found while the index describes the text of the node.
+            node.pos = tuple(pos)
+        if isinstance(node, Element) and node.child is not None:
+            self.spans[key] = [start, end, end, end, self._version]
+        else:
+            self.spans[key] = [start, start, end, end, self._version]
+        if self._recorded is not None:
+            self._recorded.append(key)
+
+    def _close_span(self, node, content_end, end):
+        """Set the end of the span of a node. """
+        entry = self.spans[id(node)]
+        entry[2] = content_end
+        entry[3] = end
+
+    def _forget(self, node):
+        """Remove the spans of a node and its descendants. """
+        stack = [node]
+        while stack:
+            node = stack.pop()
+            self.spans.pop(id(node), None)
+            if isinstance(node, Element) and node.child:
+                stack.extend(node.child)
+
+    def _close_nodes(self):
+        """Checks and closes a node that is in self._in_progress. This
+        follows `ElementNP.close_node` and returns the list of closed
+        nodes or None. """
+        found = self['ElementNP'].closing(self._in_progress)
+        if found is None:
+            return None
+        num, autoclose = found
+        closed = list()
+        for i in range(len(self._in_progress)-1, num, -1):
+            node = self._in_progress[i][0]
+            self.msg(
+                self.__module__, 'W100',
+                node.node_position,
+                (node.name, Position(autoclose))
+            )
+            self.log.child[-1].closing_ = i
+            closed.append(node)
+            del self._in_progress[i]
+        closed.append(self._in_progress[num][0])
+        del self._in_progress[num]
+        return closed
+
+    def _run(self, crt, base, joint):
+        """Run the node parsers from the caret. It follows
+        `Parser._parse` and records the spans of the nodes. When a
+        `joint` is given and only `base` elements are in progress the
+        run stops once `joint` accepts the caret, its value is then
+        returned. Returns -1 when one of the `base` elements is closed
+        and None at the end of the text. """
+        self.current_node = crt
+        while True:
+            if joint is not None and len(self._in_progress) == base:
+                index = joint(self.caret)
+                if index is not None:
+                    return index
+            if self.caret >= self.end:
+                return None
+            start = self._step = self.caret
+            closed = self._close_nodes()
+            if closed is not None:
+                if len(self._in_progress) < base:
+                    return -1
+                for node in closed[:-1]:
+                    self._close_span(node, start, start)
+                self._close_span(closed[-1], start, self.caret)
+                if self._in_progress:
+                    crt = self._in_progress[-1][0]
+                else:
+                    crt = self._root
+                self.current_node = crt
+                continue
+            match = False
+            processor = None
+            for processor in self._get_np(crt):
+                node = processor.make_node()
+                if node is not None:
+                    match = True
+                    break
+                elif self.caret == self.end:
+                    break
+            num = len(crt.child)
+            if match is False:
+                self._process_text(crt)
+            elif self._process_node(crt, node, processor) is node:
+                self._record(node, start, self.caret)
+                self.current_node = crt = node
+                continue
+            if len(crt.child) > num:
+                self._record(crt.child[-1], start, self.caret)
+            elif num and isinstance(crt.child[-1], Text):
+                self._close_span(crt.child[-1], self.caret, self.caret)
+
+    def _finish(self):
+        """Report and close the elements still in progress. """
+        self._step = self.end
+        for num, (node, _) in enumerate(self._in_progress):
+            self.msg(self.__module__, 'E100', node.node_position,
+                     [node.name])
+            self.log.child[-1].closing_ = num
+            self.log.child[-1].final_ = True
+        for node, _ in self._in_progress:
+            self._close_span(node, self.end, self.end)
+        self._in_progress = []
+
+    def _locate(self, offset, end):
+        """Return the list of elements from the document to the
+        smallest element whose content contains the text between
+        `offset` and `end`. """
+        chain = [self.doc]
+        node = self.doc
+        while node.child:
+            low, high = 0, len(node.child)
+            while low < high:
+                mid = (low + high) // 2
+                if self.span(node.child[mid])[0] < offset:
+                    low = mid + 1
+                else:
+                    high = mid
+            if low == 0:
+                break
+            node = node.child[low-1]
+            if not isinstance(node, Element) or node.child is None or \
+                    isinstance(node, RawText):
+                break
+            span = self.span(node)
+            if span[1] > offset or end > span[2]:
+                break
+            chain.append(node)
+        return chain
+
+    def _restart(self, node, offset):
+        """Return the index of the child of `node` where the parse
+        starts again and the index in the text where the child starts.
+        The nodes before it cannot have looked at the edited text. """
+        children = node.child
+        low, high = 0, len(children)
+        while low < high:
+            mid = (low + high) // 2
+            if self.span(children[mid])[3] <= offset:
+                low = mid + 1
+            else:
+                high = mid
+        index = low
+        while index > 0:
+            prev = children[index-1]
+            if index < len(children):
+                start = self.span(children[index])[0]
+            else:
+                start = self.span(prev)[3]
+            if not isinstance(prev, Text) and \
+                    offset - start >= LOOKAHEAD and \
+                    self.text.find('>', start, offset) != -1:
+                return index, start
+            index -= 1
+        return 0, self.span(node)[1]
+
+    def _reparse(self, chain, offset, end, delta, moved):
+        """Parse again the children of the last element in `chain`.
+        Returns False if the new nodes cannot be joined with the old
+        ones. """
+        node = chain[-1]
+        children = node.child
+        index, start = self._restart(node, offset)
+        holder = Element(node.name)
+        holder.has_element_ = any(
+            isinstance(child, Element) for child in children[:index]
+        )
+        dispatch = self['DispatchNP']
+        self._in_progress = [(item, dispatch) for item in chain[1:-1]]
+        if node is self.doc:
+            self._root = holder
+        else:
+            self._root = self.doc
+            self._in_progress.append((holder, dispatch))
+        first = index
+        while first < len(children) and \
+                self.span(children[first])[0] < end:
+            first += 1
+        self._joint = [children, first, self.span(node)[2], delta, holder]
+        self._recorded = list()
+        num = len(self.log.child)
+        self.caret = start
+        self.pos = self.lines.position(start)
+        base = len(self._in_progress)
+        found = self._run(holder, base, self._join)
+        if found is None and node is self.doc:
+            self._finish()
+            found = len(children)
+        if found is not None and found >= 0 and node is not self.doc:
+            # The children which are kept were parsed after the old
+            # children before them, whether an element was seen is
+            # part of the state in which the parse joins them.
+            seen = any(
+                isinstance(child, Element) for child in children[:found]
+            )
+            if bool(holder.has_element_) != seen:
+                found = -1
+        self._in_progress = []
+        self._joint = None
+        recorded = self._recorded
+        self._recorded = None
+        if found is None or found < 0:
+            for key in recorded:
+                self.spans.pop(key, None)
+            if len(self.log.child) > num:
+                del self.log[num:len(self.log.child)]
+            return False
+        if found < len(children):
+            stop = self.span(children[found])[0]
+        else:
+            stop = self.span(node)[2]
+        for child in children[index:found]:
+            self._forget(child)
+        if found > index:
+            del node[index:found]
+        if holder.child:
+            node.extend_before(index, list(holder.child))
+        self._join_log(num, (start, stop, base), delta, moved)
+        return True
+
+    def _join(self, caret):
+        """Return the index of the old child starting at the caret if
+        the parse can continue with the old nodes, -1 if the parse went
+        past the end of the content or None otherwise. """
+        children, index, stop, delta, holder = self._joint
+        while index < len(children) and \
+                self.span(children[index])[0] + delta < caret:
+            index += 1
+        self._joint[1] = index
+        if index < len(children):
+            target = self.span(children[index])[0] + delta
+        else:
+            target = stop + delta
+        if caret < target:
+            return None
+        if caret > target:
+            return -1
+        if index < len(children) and isinstance(children[index], Text) \
+                and holder.child and isinstance(holder.child[-1], Text):
+            return None
+        return index
+
+    def _join_log(self, num, region, delta, moved):
+        """Replace the messages of the nodes parsed again by the
+        messages issued after the first `num`. The `region` holds the
+        indices where the old nodes start and stop and the number of
+        elements which were kept open. A message about an element which
+        was closed implicitly remembers the index of the element in
+        `_in_progress`, the messages about the elements still open at
+        the end of the text come after the others at the same index.
+        The messages after the edit are shifted. """
+        start, stop, base = region
+        log = self.log
+        new = log.child[num:]
+        if new:
+            del log[num:len(log.child)]
+        low = search(log.child, lambda msg: msg.offset_ < start or
+                     msg.offset_ == start and msg.closing_ is not None and
+                     not msg.final_)
+        high = search(log.child, lambda msg: msg.offset_ <= stop)
+        kept = [msg for msg in log.child[low:high]
+                if msg.offset_ == stop and
+                (msg.closing_ is None or msg.closing_ < base)]
+        for msg in kept + log.child[high:]:
+            msg.offset_ += delta
+            shift_message(msg, moved[0], moved[1])
+        if high > low:
+            del log[low:high]
+        if new or kept:
+            log.extend_before(low, new + kept)
+
+
+def search(items, test):
+    """Return the index of the first item for which `test` is False.
+    The items for which it is True must come first. """
+    low, high = 0, len(items)
+    while low < high:
+        mid = (low + high) // 2
+        if test(items[mid]):
+            low = mid + 1
+        else:
+            high = mid
+    return low
+
+
+def shift(pos, old, new):
+    """Return the position `pos` after an edit which moved the end of
+    the edited text from `old` to `new`. """
+    line, column = pos[0], pos[1]
+    if line > old[0]:
+        return [line + new[0] - old[0], column]
+    if line == old[0] and column >= old[1]:
+        return [new[0], column + new[1] - old[1]]
+    return [line, column]
+
+
+def shift_message(msg, old, new):
+    """Shift the positions of a message. The arguments of a message
+    may start with a line and a column. """
+    msg['position'] = shift(msg['position'], old, new)
+    arg = msg['arg']
+    if len(arg) > 1 and isinstance(arg[0], int) and \
+            isinstance(arg[1], int):
+        msg['arg'] = type(arg)(shift(arg, old, new) + list(arg[2:]))
+    for item in arg:
+        if isinstance(item, Position):
+            item.line, item.column = shift(
+                (item.line, item.column), old, new
+            )
@@ -0,0 +1,167 @@
+"""HTML: INSTRUMENTATION of the node parsers
+
+With the parser option `instrument` set to `'true'` the calls to the
+`make_node` and `close` methods of every node parser are counted and
+timed. After each parse `parser.instrumentation.report` holds a
+dictionary
+
+    chars           number of characters parsed
+    seconds         duration of the parse
+    node_parsers    for each node parser a dictionary with
+        attempts        calls to `make_node`
+        hits            calls to `make_node` which returned a node
+        misses          calls to `make_node` which returned None
+        close_attempts  calls to `close`
+        close_hits      calls to `close` which closed the node
+        close_misses    calls to `close` which returned None
+        chars           characters consumed by the node parser
+        seconds         time spent in the node parser
+    messages        for each node parser, or module, which issued
+                    messages a dictionary with the count of each code
+
+The characters and the time of a node parser do not include those of
+the node parsers it calls. For instance the `DispatchNP` only reports
+the time it takes to choose the node parsers.
+
+Functions registered with `add_hook` are called with the parser and
+the report at the end of each parse, for instance to send it to a
+metrics exporter:
+
+    parser = Parser('html', 'default', {'instrument': 'true'})
+    add_hook(parser, lambda parser, report: export(report))
+
+Without the option the node parsers are left untouched and the only
+cost is checking the option once per parse.
+
+"""
+
+from timeit import default_timer
+
+COUNTS = (
+    'attempts', 'hits', 'misses', 'close_attempts', 'close_hits',
+    'close_misses', 'chars',
+)
+
+
+class Instrumentation(object):
+    """Replaces the `make_node` and `close` methods of the node parsers
+    of a parser by methods which count and time their calls. """
+
+    def __init__(self, parser):
+        self.parser = parser
+        self.names = dict()
+        self.stats = dict()
+        self.stack = None
+        self.start = None
+        self.report = None
+        style = parser.style_module
+        classes = list(style.REPOSITORY)
+        for val in style.MAPPING.values():
+            if not isinstance(val, str):
+                classes.extend(val[1])
+        for cls in classes:
+            name = cls.__name__
+            processor = parser[name]
+            if name in self.stats:
+                continue
+            self.names[cls.__module__] = name
+            self.stats[name] = dict.fromkeys(COUNTS, 0)
+            self.stats[name]['seconds'] = 0.0
+            self.wrap(processor, name, 'make_node', '')
+            self.wrap(processor, name, 'close', 'close_')
+        self.processors = [parser[name] for name in self.stats]
+
+    def wrap(self, processor, name, method, prefix):
+        """Replace `method` of a node parser by a method which updates
+        the statistics of `name`. """
+        func = getattr(processor, method)
+        stats = self.stats[name]
+        parser = self.parser
+        timer = default_timer
+        attempts = prefix + 'attempts'
+        hits = prefix + 'hits'
+        misses = prefix + 'misses'
+
+        def instrumented(*args):
+            """Count and time a call. """
+            stack = self.stack
+            caret = parser.caret
+            stack.append([0.0, 0])
+            start = timer()
+            try:
+                val = func(*args)
+            finally:
+                seconds = timer() - start
+                inner = stack.pop()
+                chars = parser.caret - caret
+                stats['seconds'] += seconds - inner[0]
+                stats['chars'] += chars - inner[1]
+                stack[-1][0] += seconds
+                stack[-1][1] += chars
+            stats[attempts] += 1
+            if val is None:
+                stats[misses] += 1
+            else:
+                stats[hits] += 1
+            return val
+
+        setattr(processor, method, instrumented)
+
+    def unwrap(self):
+        """Restore the methods of the node parsers. """
+        for processor in self.processors:
+            for method in ('make_node', 'close'):
+                processor.__dict__.pop(method, None)
+
+    def reset(self):
+        """Clear the statistics before a parse. """
+        for stats in self.stats.values():
+            for key in COUNTS:
+                stats[key] = 0
+            stats['seconds'] = 0.0
+        self.stack = [[0.0, 0]]
+        self.report = None
+        self.start = default_timer()
+
+    def finish(self):
+        """Create the report of the parse and call the hooks. """
+        parser = self.parser
+        messages = dict()
+        for msg in parser.log.child:
+            name = self.names.get(msg['module'], msg['module'])
+            codes = messages.setdefault(name, dict())
+            codes[msg['code']] = codes.get(msg['code'], 0) + 1
+        self.report = {
+            'chars': parser.end,
+            'seconds': default_timer() - self.start,
+            'node_parsers': dict(
+                (name, dict(stats)) for name, stats in self.stats.items()
+            ),
+            'messages': messages,
+        }
+        for hook in getattr(parser, 'instrument_hooks', ()):
+            hook(parser, self.report)
+
+
+def setup(parser):
+    """Return the `Instrumentation` to use in the next parse or None
+    if the option `instrument` is not `'true'`. """
+    crt = getattr(parser, 'instrumentation', None)
+    if parser.defaults.get('instrument') != 'true':
+        if crt is not None:
+            crt.unwrap()
+        return None
+    if crt is None or \
+            any(parser[name] is not processor
+                for name, processor in zip(crt.stats, crt.processors)):
+        crt = Instrumentation(parser)
+    crt.reset()
+    return crt
+
+
+def add_hook(parser, hook):
+    """Call `hook(parser, report)` after each instrumented parse of
+    `parser`. """
+    if not hasattr(parser, 'instrument_hooks'):
+        parser.instrument_hooks = list()
+    parser.instrument_hooks.append(hook)
@@ -0,0 +1,130 @@
+"""HTML: LINE index
+
+Positions in the text are reported as a line and a column. Instead
+of counting the new lines from the caret every time a position is
+needed, the offsets where each line starts are collected once per
+document, the first time they are needed, and a position is found
+with a binary search.
+
+The text does not need to start at the beginning of the document.
+When it is a piece of a larger input the position of its first
+character may be given so that the positions are absolute.
+
+An index may be updated after an edit of its text with `edit`, which
+only scans the inserted text. The offsets of the lines after the edit
+are not moved one by one: the index remembers that the lines from
+some line on are shifted, and only the lines between that line and
+the next edit are moved.
+
+
+"""
+
+import re
+from bisect import bisect_right
+
+RE_NEWLINE = re.compile('\n')
+
+
+class LineIndex(object):
+    """Maps offsets in the text to lines and columns. """
+
+    def __init__(self, text, start=(1, 1)):
+        self.text = text
+        self.start = tuple(start)
+        self.starts = None
+        # The offsets in `starts` from `moved` on are `shift` characters
+        # behind the lines they mark.
+        self.moved = None
+        self.shift = 0
+
+    def _lines(self):
+        """Return the list of the offsets where the lines start. """
+        if self.starts is None:
+            self.starts = [0]
+            self.starts.extend(
+                match.end(0) for match in RE_NEWLINE.finditer(self.text)
+            )
+            self.moved = len(self.starts)
+        return self.starts
+
+    def _count(self, index):
+        """Return the number of lines starting at or before `index`.
+        """
+        starts = self._lines()
+        moved = self.moved
+        if moved < len(starts) and index >= starts[moved] + self.shift:
+            return bisect_right(starts, index - self.shift, moved)
+        return bisect_right(starts, index, 0, moved)
+
+    def position(self, index):
+        """Return the position `[line, column]` of `index`. """
+        line = self._count(index)
+        if line == 1:
+            return [self.start[0], self.start[1] + index]
+        begin = self.starts[line-1]
+        if line > self.moved:
+            begin += self.shift
+        return [self.start[0] + line - 1, index - begin + 1]
+
+    def edit(self, offset, end, inserted, text):
+        """Update the index after the characters from `offset` to
+        `end` were replaced by the string `inserted`, `text` is the new
+        text. """
+        self.text = text
+        if self.starts is None:
+            return
+        starts = self.starts
+        low = self._count(offset)
+        high = self._count(end)
+        # Move the lines between `moved` and `high` so that the shift
+        # starts at `high`.
+        for num in range(self.moved, high):
+            starts[num] += self.shift
+        for num in range(high, self.moved):
+            starts[num] -= self.shift
+        self.shift += len(inserted) - end + offset
+        new = [offset + match.end(0)
+               for match in RE_NEWLINE.finditer(inserted)]
+        starts[low:high] = new
+        self.moved = low + len(new)
+
+    def locate(self, index):
+        """Return a `LinePosition` which computes the position of
+        `index` only when it is read. """
+        return LinePosition(self, index)
+
+
+class LinePosition(object):
+    """A `(line, column)` pair which only stores an offset until one
+    of its values is requested. """
+
+    __slots__ = ('index', 'offset', '_pos')
+
+    def __init__(self, index, offset):
+        self.index = index
+        self.offset = offset
+        self._pos = None
+
+    def _get(self):
+        """Return the position as a tuple. """
+        if self._pos is None:
+            self._pos = tuple(self.index.position(self.offset))
+        return self._pos
+
+    def __getitem__(self, i):
+        return self._get()[i]
+
+    def __iter__(self):
+        return iter(self._get())
+
+    def __len__(self):
+        return 2
+
+    def __eq__(self, other):
+        return self._get() == tuple(other)
+
+    def __ne__(self, other):
+        return not self.__eq__(other)
+
+    def __repr__(self):
+        return repr(self._get())
@@ -0,0 +1,42 @@
+"""HTML: MESSAGE filter
+
+Decides which messages the node parsers issue. The node parsers ask
+before computing the positions and arguments of a message so that no
+work is done for messages that will be discarded. This is controlled
+by the parser options
+
+- messages: `'false'` to stop the node parsers from issuing messages.
+- message_limit: the maximum number of messages issued for each code
+  of a node parser module. `'0'` means that there is no limit.
+
+"""
+
+
+class MessageFilter(object):
+    """Keeps track of the messages issued during a parse. """
+
+    def __init__(self, enabled=True, limit=0):
+        self.enabled = enabled
+        self.limit = limit
+        self.count = dict()
+
+    def accept(self, node_parser, code):
+        """Return True if `node_parser` may issue the message `code`.
+        """
+        if not self.enabled:
+            return False
+        if not self.limit:
+            return True
+        key = (node_parser.__module__, code)
+        num = self.count.get(key, 0)
+        if num >= self.limit:
+            return False
+        self.count[key] = num + 1
+        return True
+
+
+def from_options(defaults):
+    """Create a `MessageFilter` from the options of the parser. """
+    enabled = defaults.get('messages', 'true') != 'false'
+    limit = int(defaults.get('message_limit', 0) or 0)
+    return MessageFilter(enabled, limit)
@@ -0,0 +1,304 @@
+"""HTML: PARALLEL parsing
+
+`parse_parallel` parses a single large document in worker processes.
+The text is first scanned for the places where it may be cut: the
+opening tags found outside of comments, CDATA sections, doctypes,
+processing instructions and the content of the elements whose content
+is raw text. The scan follows the rules of the `element` module to
+guess the elements open at each of these places and, near each of
+the evenly spaced targets, it chooses the tag with the fewest open
+elements.
+
+    doc, log = parse_parallel(text, workers=4)
+
+Each segment is parsed by an `EventParser` which starts inside the
+elements guessed by the scan, see the `events` module. The main
+process parses the first segment while the workers parse the others
+and then joins the pieces in a single `CompactDocument`. The workers
+receive the whole text when they start, so the spans of the nodes and
+the positions of the messages are already those of the document.
+
+The guess of the scan is checked against the state in which the
+previous segment stops: the index where it stops and the open
+elements. When they differ the segment is parsed again in the main
+process from the actual state, so the result is always the same as
+the one of `parse_compact`.
+
+Texts shorter than `MIN_SEGMENT` characters per segment and parses
+which limit the number of messages are done by `parse_compact` in the
+main process.
+
+"""
+
+import multiprocessing
+from array import array
+from itertools import chain, islice
+from lexor.command.lang import load_rel
+
+BATCH = load_rel(__file__, 'batch')
+ELEMENT = load_rel(__file__, 'element')
+COMPACT = BATCH.COMPACT
+
+# Minimum number of characters per segment.
+MIN_SEGMENT = 1 << 16
+
+# Number of opening tags examined after each target.
+WINDOW = 256
+
+# The text being parsed, set when a worker starts.
+TEXT = None
+
+
+def init_worker(text, defaults=None):
+    """Store the text in the worker. The parser is created first since
+    loading its node parsers executes this module again. """
+    global TEXT
+    BATCH.get_parser(defaults)
+    TEXT = text
+
+
+def find_splits(text, count):
+    """Return a list with at most `count - 1` pairs `(index, state)`
+    where the text may be cut. `state` is the guess of the elements
+    open at `index` in the form expected by `EventParser.events`. """
+    size = len(text)
+    targets = [size * num // count for num in range(count-1, 0, -1)]
+    splits = list()
+    stack = list()
+    best = None
+    seen = 0
+    index = text.find('<')
+    while targets and index != -1:
+        char = text[index+1:index+2]
+        if char == '!' or char == '?':
+            index = _skip(text, index)
+        elif char == '/':
+            end = text.find('>', index+2)
+            if end == -1:
+                break
+            name = text[index+2:end].lower()
+            for num in range(len(stack)-1, -1, -1):
+                if stack[num][0] == name:
+                    del stack[num:]
+                    break
+            index = end + 1
+        elif char.isalpha() or char in [":", "_"]:
+            end = text.find('>', index+1)
+            if end == -1:
+                break
+            tmp = text.find('<', index+1, end)
+            if tmp != -1:
+                index = tmp
+                continue
+            if index >= targets[-1]:
+                if best is None or len(stack) < len(best[1]):
+                    best = (index, tuple(tuple(item) for item in stack))
+                seen += 1
+                if seen == WINDOW or not stack:
+                    splits.append(best)
+                    while targets and targets[-1] <= index:
+                        targets.pop()
+                    best = None
+                    seen = 0
+            index = _open(text, index, end, stack)
+        else:
+            index += 1
+        if index != -1:
+            index = text.find('<', index)
+    if best is not None:
+        splits.append(best)
+    return splits
+
+
+def _skip(text, index):
+    """Return the index after the comment, CDATA section, doctype or
+    processing instruction at `index` or -1 if it is not closed. """
+    if text.startswith('<!--', index):
+        tmp = text.find('-->', index+4)
+        return -1 if tmp == -1 else tmp + 3
+    if text.startswith('<![CDATA[', index):
+        tmp = text.find(']]>', index+9)
+        return -1 if tmp == -1 else tmp + 3
+    if text.startswith('<?', index):
+        tmp = text.find('?>', index+2)
+        return -1 if tmp == -1 else tmp + 2
+    tmp = text.find('>', index+2)
+    return -1 if tmp == -1 else tmp + 1
+
+
+def _open(text, index, end, stack):
+    """Update `stack` with the opening tag at `index` which ends at
+    `end` and return the index after the element or its tag. """
+    match = ELEMENT.RE.search(text, index+1)
+    name = text[index+1:match.end(0)-1].lower()
+    for num in range(len(stack)-1, -1, -1):
+        crt, flag = stack[num]
+        names = ELEMENT.AUTO_CLOSE.get(crt)
+        if names is not None and name in names:
+            del stack[num:]
+            break
+        names = ELEMENT.AUTO_CLOSE_FIRST.get(crt)
+        if names is not None and not flag and name in names:
+            del stack[num:]
+            break
+    if stack:
+        stack[-1][1] = True
+    if name in ELEMENT.RAWTEXT_ELEMENT:
+        match = ELEMENT.RE_RAWTEXT_CLOSE[name].search(text, end+1)
+        return -1 if match is None else match.end(0)
+    if name not in ELEMENT.VOID_ELEMENT:
+        stack.append([name, False])
+    return end + 1
+
+
+def parse_segment(start, stop, state, defaults=None):
+    """Parse the text from `start` to `stop` inside the elements given
+    in `state`. Return the segment as a `CompactDocument` whose first
+    nodes after the document stand for the elements in `state`, the
+    messages, the index where the parse stopped, the state at that
+    point or None if the parse reached the end of the text and the
+    stack of the segment. This is the task run by the workers. """
+    parser = BATCH.get_parser(defaults)
+    doc = COMPACT.CompactDocument(TEXT)
+    stack = [[0, -1]]
+    for name, _ in state:
+        stack.append([doc.append(COMPACT.ELEMENT, name, stack[-1][0], -1,
+                                 start, start), -1])
+    for item in stack:
+        doc.first_child[item[0]] = -1
+    events = parser.events(TEXT, None, start, stop, state)
+    COMPACT.add_events(doc, parser, events, stack)
+    doc.text = None
+    return doc, BATCH.pack_log(parser.log), parser.caret, _state(parser), \
+        stack
+
+
+def join(doc, stack, part, last):
+    """Append the nodes of a segment returned by `parse_segment` to
+    `doc`. The segment starts inside the elements in `stack`, which is
+    updated with the last stack of the segment in `last`. """
+    size = len(stack) - 1
+    base = len(doc.kind) - size - 1
+    top = [item[0] for item in stack]
+    table = [doc.intern(name) for name in part.names]
+    doc.kind.extend(part.kind[size+1:])
+    doc.tag.extend(array('i', [table[tag] for tag in part.tag[size+1:]]))
+    doc.parent.extend(array('i', [
+        top[index] if index <= size else index + base
+        for index in part.parent[size+1:]
+    ]))
+    for name in ('first_child', 'next_sibling'):
+        getattr(doc, name).extend(array('i', [
+            -1 if index == -1 else index + base
+            for index in getattr(part, name)[size+1:]
+        ]))
+    for name in ('start', 'end', 'data_start', 'data_length',
+                 'attribute_start', 'attribute_end'):
+        getattr(doc, name).extend(getattr(part, name)[size+1:])
+    for index, data in part.extra.items():
+        doc.extra[index + base] = data
+    for num in range(size+1):
+        child = part.first_child[num]
+        if child == -1:
+            continue
+        if stack[num][1] == -1:
+            doc.first_child[stack[num][0]] = child + base
+        else:
+            doc.next_sibling[stack[num][1]] = child + base
+    kept = 0
+    while kept < len(last) and last[kept][0] <= size:
+        kept += 1
+    for num in range(kept, size+1):
+        doc.end[top[num]] = part.end[num]
+    new = list()
+    for index, child in last:
+        if index <= size:
+            item = [top[index], stack[index][1]]
+        else:
+            item = [index + base, -1]
+        if child != -1:
+            item[1] = child + base
+        new.append(item)
+    stack[:] = new
+
+
+def resume(doc, stack, parser, start, stop, state):
+    """Parse the text of `doc` from `start` to `stop` inside the
+    elements in `state` and append the nodes to `doc`. A text at
+    `start` is merged with the text node which ends there. """
+    events = parser.events(doc.text, parser.uri, start, stop, state)
+    first = list(islice(events, 1))
+    last = stack[-1][1]
+    if first and first[0][0] == 'text' and last == len(doc.kind) - 1 \
+            and doc.kind[last] == COMPACT.TEXT and doc.end[last] == start:
+        data = doc.data(last) + first[0][1]
+        doc.end[last] = parser.span[1]
+        index = doc.text.find(data, doc.start[last], doc.end[last])
+        doc.data_start[last] = index
+        doc.data_length[last] = len(data)
+        doc.extra.pop(last, None)
+        if index == -1:
+            doc.extra[last] = data
+        first = []
+    COMPACT.add_events(doc, parser, chain(first, events), stack)
+
+
+def parse_parallel(text, defaults=None, uri=None, workers=None,
+                   segments=None):
+    """Parse `text` in `workers` processes and return a
+    `CompactDocument` and the log of the parse. The text is cut in at
+    most `segments` pieces, by default one more than the number of
+    workers since the main process parses the first one. """
+    parser = BATCH.get_parser(defaults)
+    if workers is None:
+        workers = multiprocessing.cpu_count()
+    if segments is None:
+        segments = workers + 1
+    segments = min(segments, len(text) // MIN_SEGMENT)
+    splits = []
+    if segments > 1 and (defaults or {}).get('message_limit', '0') == '0':
+        splits = find_splits(text, segments)
+    if not splits:
+        return COMPACT.parse_compact(text, uri=uri, parser=parser)
+    stops = [index for index, _ in splits[1:]] + [len(text)]
+    pool = BATCH.make_pool(workers, init_worker, (text, defaults))
+    results = list()
+    try:
+        for (index, state), stop in zip(splits, stops):
+            results.append(pool.apply_async(parse_segment, (index, stop,
+                                                            state, defaults)))
+        doc = COMPACT.CompactDocument(text)
+        stack = [[0, -1]]
+        events = parser.events(text, uri, 0, splits[0][0])
+        COMPACT.add_events(doc, parser, events, stack)
+        doc.lines = parser.lines
+        reader = parser['ElementNP'].get_reader(parser)
+        log = parser.log
+        uri = parser.uri
+        caret, state = parser.caret, _state(parser)
+        for (index, guess), stop, result in zip(splits, stops, results):
+            if state is None:
+                break
+            part, messages, end, after, last = result.get()
+            if caret == index and state == guess:
+                join(doc, stack, part, last)
+                BATCH.make_log(messages, uri, log)
+                caret, state = end, after
+                continue
+            resume(doc, stack, parser, caret, stop, state)
+            BATCH.make_log(BATCH.pack_log(parser.log), uri, log)
+            caret, state = parser.caret, _state(parser)
+    finally:
+        pool.terminate()
+        pool.join()
+    doc.reader = reader
+    return doc, log
+
+
+def _state(parser):
+    """Return the elements open where the last parse of an
+    `EventParser` stopped or None if it reached the end of the text.
+    """
+    if parser.open_tags is None:
+        return None
+    return tuple((tag.name, tag.has_element_) for tag in parser.open_tags)
@@ -12,9 +12,12 @@ where `*` is a space character (this includes tabs and new lines).
 """
 
 import re
+from lexor.command.lang import load_rel
 from lexor.core.parser import NodeParser
 from lexor.core.elements import ProcessingInstruction, Text
 
+SPANS = load_rel(__file__, 'spans')
+
 RE = re.compile('.*?[ \t\n\r\f\v]')
 
 
@@ -28,24 +31,32 @@ class ProcessingInstructionNP(NodeParser):
         caret = parser.caret
         if parser.text[caret:caret+2] != '<?':
             return None
-        pos = parser.copy_pos()
         match = RE.search(parser.text, caret+1)
         if match:
             target = parser.text[parser.caret+1:match.end(0)-1]
         else:
-            self.msg('E100', pos)
+            if parser.partial:
+                parser.need_input()
+            if parser.messages.accept(self, 'E100'):
+                self.msg('E100', parser.pos)
             content = parser.text[parser.caret:parser.end]
             parser.update(parser.end)
             return Text(content)
         index = parser.text.find('?>', match.end(0), parser.end)
         if index == -1:
-            self.msg('E101', pos, [target])
-            content = parser.text[match.end(0):parser.end]
+            if parser.partial:
+                parser.need_input()
+            if parser.messages.accept(self, 'E101'):
+                self.msg('E101', parser.pos, [target])
+            start = match.end(0)
             parser.update(parser.end)
-            return ProcessingInstruction(target, content)
-        content = parser.text[match.end(0):index]
+            return SPANS.make(
+                parser, ProcessingInstruction, start, parser.end, target
+            )
         parser.update(index+2)
-        return ProcessingInstruction(target, content)
+        return SPANS.make(
+            parser, ProcessingInstruction, match.end(0), index, target
+        )
 
 
 MSG = {
@@ -0,0 +1,208 @@
+"""HTML: SELECTIVE parser
+
+The `SelectiveParser` only builds the elements with the given names.
+The text between them is scanned with a single regular expression
+which stops at the opening tags of the requested elements and at the
+constructs that may hide a tag: comments, CDATA sections, doctypes,
+processing instructions and the elements whose content is raw text.
+These constructs are skipped by looking for the string that closes
+them, no nodes are created for them.
+
+When an opening tag of a requested element is found the element and
+all of its content are parsed as usual. A requested element nested
+in another one is part of the content of the outer element and it is
+not reported again.
+
+    parser = SelectiveParser()
+    doc = parser.select(text, ['a', 'meta', 'link'], ['href', 'rel'])
+    for node in doc:
+        ...
+
+If attribute names are given only the elements declaring at least
+one of them are kept, the content of the other elements is scanned
+for more matches.
+
+Since the ancestors of a requested element are not known, the
+content of an element may differ from the one of a full parse:
+
+- An end tag which does not close one of the elements being built is
+  assumed to close an ancestor and it ends the element. In
+  `<a>foo</span>bar</a>` the element `a` only contains `foo` while a
+  full parse ignores the stray `</span>`.
+- An opening tag only closes the elements being built, it cannot
+  close them through an ancestor that was not parsed. In
+  `<p><b>x<div>y</div></b>` a full parse closes `b` with `p` at
+  `<div>` while the `b` selected alone contains the `div`.
+
+"""
+
+import re
+from lexor.command.lang import load_rel, map_explanations
+from lexor.core.parser import Parser
+from lexor.core.elements import Document
+
+# The parser reports the nodes it cannot close with the name of the
+# module of its class.
+from lexor.core.parser import MSG, MSG_EXPLANATION
+
+ELEMENT = load_rel(__file__, 'element')
+
+
+class SelectiveParser(Parser):
+    """Parses only the requested elements of an html document with
+    the `default` style. """
+
+    def __init__(self, defaults=None):
+        Parser.__init__(self, 'html', 'default', defaults)
+
+    def select(self, text, names, attributes=None, uri=None):
+        """Return a document with the elements in `text` whose name
+        is in `names`. The messages are stored in the `log` of the
+        parser. """
+        if self._reload:
+            self.load_node_parsers()
+        self.text = text
+        self.end = len(text)
+        self.pos = [1, 1]
+        self.caret = 0
+        self.doc = Document(self._lang)
+        if uri:
+            self._uri = uri
+        else:
+            self._uri = 'string@0x%x' % id(text)
+        self.doc.uri_ = self._uri
+        self.log = Document("lexor", "log")
+        self.log.modules = dict()
+        self.log.explanation = dict()
+        if hasattr(self.style_module, 'pre_process'):
+            self.style_module.pre_process(self)
+        names = set(name.lower() for name in names)
+        self._select(compile_scanner(names), names, attributes)
+        if hasattr(self.style_module, 'post_process'):
+            self.style_module.post_process(self)
+        map_explanations(self.log.modules, self.log.explanation)
+        return self.doc
+
+    def _skip(self, index, name):
+        """Return the index after the construct starting at `index`
+        or -1 if the construct is not closed. If `name` is given then
+        the construct is an element whose content is raw text. """
+        text = self.text
+        if name is not None:
+            tmp = self.boundary.find('>', index+1)
+            if tmp == -1:
+                return -1
+            start = self.boundary.find('<', index+1)
+            if start != -1 and start < tmp:
+                return index + 1
+            match = ELEMENT.RE_RAWTEXT_CLOSE[name.lower()].search(text,
+                                                                  tmp+1)
+            return -1 if match is None else match.end(0)
+        if text.startswith('<!--', index):
+            tmp = text.find('-->', index+4)
+            return -1 if tmp == -1 else tmp + 3
+        if text.startswith('<![CDATA[', index):
+            tmp = text.find(']]>', index+9)
+            return -1 if tmp == -1 else tmp + 3
+        if text.startswith('<?', index):
+            tmp = text.find('?>', index+2)
+            return -1 if tmp == -1 else tmp + 2
+        tmp = text.find('>', index+2)
+        return -1 if tmp == -1 else tmp + 1
+
+    def _select(self, scanner, names, attributes):
+        """Scan the text and parse the requested elements. """
+        text = self.text
+        element = self['ElementNP']
+        self.current_node = self.doc
+        self._in_progress = []
+        while True:
+            match = scanner.search(text, self.caret)
+            if match is None:
+                break
+            index = match.start(0)
+            name = match.group('name')
+            if name is None or name.lower() not in names:
+                index = self._skip(index, name)
+                if index == -1:
+                    break
+                self.update(index)
+                continue
+            self.update(index)
+            if attributes and not self._declares(index, attributes):
+                self.update(index+1)
+                continue
+            num = len(self.log)
+            node = element.make_node()
+            if node is None:
+                self.update(index+1)
+                continue
+            tag_end = self.caret
+            self._process_node(self.doc, node, element)
+            self._parse_element()
+            node = self.doc[-1]
+            if attributes and not any(att in node for att in attributes):
+                del self.doc[len(self.doc)-1]
+                if len(self.log) > num:
+                    del self.log[num:]
+                self.caret = tag_end
+                self.pos = self.lines.position(tag_end)
+
+    def _declares(self, index, attributes):
+        """Return False if the opening tag at `index` cannot declare
+        any of the `attributes`. """
+        end = self.text.find('>', index)
+        if end == -1:
+            return True
+        for att in attributes:
+            if self.text.find(att, index, end) != -1:
+                return True
+        return False
+
+    def _parse_element(self):
+        """Parse the content of the last element in the document. It
+        follows `Parser._parse` but it stops as soon as the element
+        is closed. """
+        self.current_node = crt = self.doc
+        if self._in_progress:
+            self.current_node = crt = self._in_progress[-1][0]
+        while self._in_progress and self.caret < self.end:
+            tmp = self._close_node()
+            if tmp is not None:
+                self.current_node = crt = tmp
+                continue
+            if self.text.startswith('</', self.caret) and \
+                    self.boundary.find('>', self.caret) != -1:
+                break
+            match = False
+            processor = None
+            for processor in self._get_np(crt):
+                node = processor.make_node()
+                if node is not None:
+                    match = True
+                    break
+                elif self.caret == self.end:
+                    break
+            if match is False:
+                self._process_text(crt)
+            elif self._process_node(crt, node, processor) is node:
+                self.current_node = crt = node
+        if self.caret == self.end:
+            for node, processor in self._in_progress:
+                node_pos = node.node_position
+                self.msg(self.__module__, 'E100', node_pos, [node.name])
+        self._in_progress = []
+        self.current_node = self.doc
+
+
+def compile_scanner(names):
+    """Return a regular expression that finds the opening tags of the
+    elements in `names` and the constructs that need to be skipped.
+    """
+    tags = sorted(set(names) | set(ELEMENT.RAWTEXT_ELEMENT), key=len,
+                  reverse=True)
+    return re.compile(
+        r'<(?:[!?]|(?P<name>%s)(?=[ \t\n\r\f\v/>]))' % '|'.join(
+            re.escape(tag) for tag in tags
+        ), re.IGNORECASE
+    )
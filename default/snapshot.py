@@ -0,0 +1,374 @@
+"""HTML: SNAPSHOT files
+
+A snapshot stores a `CompactDocument` and the messages of its parse
+in a binary file, so that the stages which read a document after it
+is parsed do not have to parse it again:
+
+    doc, log = parse_compact(text)
+    save_snapshot('page.snap', doc, pack_log(log))
+    doc = load_snapshot('page.snap')
+    messages = doc.messages()
+
+The file starts with the magic bytes `MAGIC`, the version of the
+format as an unsigned 32 bit integer and, for each section, its
+offset and length in bytes as unsigned 64 bit integers. All the
+integers are little endian. The sections of version 1 are, in order,
+
+    text              the source of the document encoded in UTF-8
+    names             table of the names of the nodes and attributes
+    strings           table of the other strings
+    kind ...          one section per array of the `CompactDocument`,
+    attribute_end     `kind` has 8 bit integers, the others 32 bit
+    extra             pairs (node, string) with the data of the nodes
+                      which is not found in the text
+    attribute_index   for each node the index of its first attribute,
+                      plus the number of attributes
+    attribute_records triples (name, start, length) for each attribute,
+                      the value is the span of the text which starts
+                      at `start` or the string `length` if `start` is
+                      -1
+    message_records   tuples (module, code, line, column, count) for
+                      each message, the strings are in `strings`
+    arguments         pairs (kind, value) with the `count` arguments
+                      of each message, the value is an integer if
+                      `kind` is 0, the index of a string if it is 1,
+                      the number of arguments of a list which follow
+                      if it is 2 and the index of the format of a
+                      `Position` whose line and column follow if it
+                      is 3
+
+A table of strings is made of its number of strings, the offsets in
+bytes of each string plus the end of the last one and the strings
+encoded in UTF-8. The names are interned, each one is stored once.
+The spans count characters of the text, not bytes.
+
+`load_snapshot` maps the file in memory and returns a
+`SnapshotDocument`. The arrays, the text and the tables are only read
+from the file the first time they are used and the nodes are created
+by `view`, `to_node` and `to_document` as for any `CompactDocument`.
+
+The arguments of the messages which are not integers, lists or
+`Position` objects are stored as strings, tuples are read back as
+lists.
+
+"""
+
+import sys
+import mmap
+import struct
+from array import array
+from lexor.command.lang import load_rel
+from lexor.util import Position
+
+COMPACT = load_rel(__file__, 'compact')
+LINES = load_rel(__file__, 'lines')
+
+MAGIC = b'LXHTMLSN'
+VERSION = 1
+
+HEADER = struct.Struct('<8sI')
+SECTION = struct.Struct('<QQ')
+COUNT = struct.Struct('<i')
+
+ARRAYS = (
+    'kind', 'tag', 'parent', 'first_child', 'next_sibling', 'start',
+    'end', 'data_start', 'data_length', 'attribute_start',
+    'attribute_end',
+)
+SECTIONS = ('text', 'names', 'strings') + ARRAYS + (
+    'extra', 'attribute_index', 'attribute_records', 'message_records',
+    'arguments',
+)
+TYPECODE = {'kind': 'b'}
+
+# The methods of `array` named `tostring` and `fromstring` in Python 2.
+TOBYTES = getattr(array, 'tobytes', None) or array.tostring
+FROMBYTES = getattr(array, 'frombytes', None) or array.fromstring
+
+
+class SnapshotDocument(COMPACT.CompactDocument):
+    """A `CompactDocument` read from a snapshot. `buf` is the content
+    of the file, usually a memory map. """
+
+    def __init__(self, buf):
+        # pylint: disable=super-init-not-called
+        self.buf = buf
+        self.sections = read_header(buf)
+        self.reader = None
+        self.attribute_cache = dict()
+
+    def __getattr__(self, name):
+        if name not in SECTIONS and name not in ('lines', 'name_index'):
+            raise AttributeError(name)
+        if name == 'text':
+            start, length = self.sections['text']
+            value = _decode(self.buf[start:start+length])
+        elif name == 'lines':
+            value = LINES.LineIndex(self.text)
+        elif name in ('names', 'strings'):
+            value = _unpack_strings(self.buf, *self.sections[name])
+        elif name == 'name_index':
+            value = dict((key, num) for num, key in enumerate(self.names))
+        elif name == 'extra':
+            pairs = self._array('extra')
+            strings = self.strings
+            value = dict((pairs[num], strings[pairs[num+1]])
+                         for num in range(0, len(pairs), 2))
+        else:
+            value = self._array(name)
+        self.__dict__[name] = value
+        return value
+
+    def _array(self, name):
+        """Read the array stored in the section `name`. """
+        start, length = self.sections[name]
+        values = array(TYPECODE.get(name, 'i'))
+        FROMBYTES(values, self.buf[start:start+length])
+        if sys.byteorder == 'big':
+            values.byteswap()
+        return values
+
+    def attributes(self, index):
+        """Return a list of `(name, value)` pairs with the attributes
+        of an element. """
+        try:
+            return self.attribute_cache[index]
+        except KeyError:
+            pass
+        items = self._attributes(index)
+        self.attribute_cache[index] = items
+        return items
+
+    def _attributes(self, index):
+        """Read the attributes of a node. """
+        records = self.attribute_records
+        names = self.names
+        text = self.text
+        items = []
+        for num in range(3 * self.attribute_index[index],
+                         3 * self.attribute_index[index+1], 3):
+            start = records[num+1]
+            if start == -1:
+                value = self.strings[records[num+2]]
+            else:
+                value = text[start:start+records[num+2]]
+            items.append((names[records[num]], value))
+        return items
+
+    def read_attributes(self):
+        """Read the attributes of all the elements. """
+        cache = self.attribute_cache
+        kind = self.kind
+        for index in range(len(kind)):
+            if COMPACT.ELEMENT <= kind[index] <= COMPACT.RAWTEXT and \
+                    index not in cache:
+                cache[index] = self._attributes(index)
+
+    def __getstate__(self):
+        raise TypeError('a SnapshotDocument cannot be pickled, pickle '
+                        'the path of its file instead')
+
+    def messages(self):
+        """Return the messages stored with the document in the form
+        returned by `pack_log`. """
+        records = self.message_records.tolist()
+        arguments = self.arguments.tolist()
+        strings = self.strings
+        messages = list()
+        index = 0
+        for num in range(0, len(records), 5):
+            arg, index = _unpack_args(arguments, index, records[num+4],
+                                      strings)
+            messages.append((strings[records[num]], strings[records[num+1]],
+                             (records[num+2], records[num+3]), arg))
+        return messages
+
+
+def read_header(buf):
+    """Return a dictionary with the offset and length of each section
+    of a snapshot. """
+    if len(buf) < HEADER.size:
+        raise ValueError('the snapshot is truncated')
+    magic, version = HEADER.unpack_from(buf, 0)
+    if magic != MAGIC:
+        raise ValueError('not a snapshot of an html document')
+    if version != VERSION:
+        raise ValueError('snapshot version %d is not supported' % version)
+    size = len(buf)
+    if size < HEADER.size + SECTION.size * len(SECTIONS):
+        raise ValueError('the snapshot is truncated')
+    sections = dict()
+    for num, name in enumerate(SECTIONS):
+        start, length = SECTION.unpack_from(
+            buf, HEADER.size + SECTION.size * num
+        )
+        if start + length > size:
+            raise ValueError('the snapshot is truncated')
+        sections[name] = (start, length)
+    return sections
+
+
+def load_snapshot(path):
+    """Map the snapshot file `path` in memory and return its
+    `SnapshotDocument`. """
+    with open(path, 'rb') as handle:
+        buf = mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ)
+    return SnapshotDocument(buf)
+
+
+def save_snapshot(path, doc, messages=()):
+    """Write a `CompactDocument` and the `messages` of its parse, in
+    the form returned by `pack_log`, to the file `path`. The
+    attributes of the document are read if they have not been. """
+    sections = pack(doc, messages)
+    with open(path, 'wb') as handle:
+        handle.write(HEADER.pack(MAGIC, VERSION))
+        offset = HEADER.size + SECTION.size * len(sections)
+        for data in sections:
+            handle.write(SECTION.pack(offset, len(data)))
+            offset += len(data)
+        for data in sections:
+            handle.write(data)
+
+
+def pack(doc, messages=()):
+    """Return a list with the content of each section of the snapshot
+    of `doc`. """
+    text = doc.text
+    names = list(doc.names)
+    name_index = dict(doc.name_index)
+    strings = list()
+    string_index = dict()
+    kind = doc.kind
+    attribute_index = array('i', [0])
+    records = array('i')
+    for node in range(len(kind)):
+        if COMPACT.ELEMENT <= kind[node] <= COMPACT.RAWTEXT:
+            start = doc.attribute_start[node]
+            end = doc.attribute_end[node]
+            for key, value in doc.attributes(node):
+                found = -1 if start == -1 else text.find(value, start, end)
+                if found == -1:
+                    value = _intern(strings, string_index, value)
+                else:
+                    value = len(value)
+                records.extend(
+                    (_intern(names, name_index, key), found, value)
+                )
+        attribute_index.append(len(records) // 3)
+    extra = array('i')
+    for node in sorted(doc.extra):
+        extra.extend((node, _intern(strings, string_index, doc.extra[node])))
+    message_records = array('i')
+    arguments = array('i')
+    for module, code, position, arg in messages:
+        message_records.extend((
+            _intern(strings, string_index, module),
+            _intern(strings, string_index, code),
+            position[0], position[1], len(arg),
+        ))
+        _pack_args(arg, arguments, strings, string_index)
+    sections = [
+        _encode(text),
+        _pack_strings(names),
+        _pack_strings(strings),
+    ]
+    sections.extend(_bytes(getattr(doc, name)) for name in ARRAYS)
+    sections.extend(_bytes(values) for values in (
+        extra, attribute_index, records, message_records, arguments
+    ))
+    return sections
+
+
+def _pack_args(arg, arguments, strings, string_index):
+    """Append the arguments of a message to `arguments`. """
+    for item in arg:
+        if isinstance(item, int):
+            arguments.extend((0, item))
+        elif isinstance(item, Position):
+            arguments.extend((3, _intern(strings, string_index, item.fmt)))
+            arguments.extend((0, item.line, 0, item.column))
+        elif isinstance(item, (list, tuple)):
+            arguments.extend((2, len(item)))
+            _pack_args(item, arguments, strings, string_index)
+        else:
+            arguments.extend((1, _intern(strings, string_index, str(item))))
+
+
+def _unpack_args(arguments, index, count, strings):
+    """Return a list with `count` arguments starting at `index` and
+    the index after them. """
+    arg = list()
+    for _ in range(count):
+        kind, value = arguments[index], arguments[index+1]
+        index += 2
+        if kind == 1:
+            value = strings[value]
+        elif kind == 2:
+            value, index = _unpack_args(arguments, index, value, strings)
+        elif kind == 3:
+            value = Position((arguments[index+1], arguments[index+3]),
+                             strings[value])
+            index += 4
+        arg.append(value)
+    return arg, index
+
+
+def _intern(table, index, value):
+    """Return the index of `value` in `table`, adding it if needed.
+    """
+    try:
+        return index[value]
+    except KeyError:
+        index[value] = len(table)
+        table.append(value)
+        return index[value]
+
+
+def _bytes(values):
+    """Return the content of an array in little endian order. """
+    if sys.byteorder == 'big':
+        values = array(values.typecode, values)
+        values.byteswap()
+    return TOBYTES(values)
+
+
+def _encode(value):
+    """Return a string encoded in UTF-8, byte strings are kept as
+    they are. """
+    if isinstance(value, bytes):
+        return value
+    return value.encode('utf-8')
+
+
+def _decode(data):
+    """Return the string encoded in UTF-8 in `data`. Python 2 keeps
+    the byte string, the documents are parsed from byte strings. """
+    if str is bytes:
+        return data
+    return data.decode('utf-8')
+
+
+def _pack_strings(strings):
+    """Return a table of strings. """
+    data = [_encode(item) for item in strings]
+    offsets = array('i', [0])
+    total = 0
+    for item in data:
+        total += len(item)
+        offsets.append(total)
+    return COUNT.pack(len(data)) + _bytes(offsets) + b''.join(data)
+
+
+def _unpack_strings(buf, start, length):
+    """Return the list of strings in a table. """
+    count = COUNT.unpack_from(buf, start)[0]
+    offsets = array('i')
+    begin = start + COUNT.size
+    FROMBYTES(offsets, buf[begin:begin + offsets.itemsize*(count+1)])
+    if sys.byteorder == 'big':
+        offsets.byteswap()
+    begin += offsets.itemsize * (count+1)
+    data = buf[begin:start+length]
+    return [_decode(data[offsets[num]:offsets[num+1]])
+            for num in range(count)]
@@ -0,0 +1,212 @@
+"""HTML: SOURCE files
+
+`parse_file` parses a file given by its path and `parse_bytes` a
+bytes-like object without the caller having to decode it first:
+
+    doc, log = parse_file('page.html')
+    doc, log = parse_bytes(data, encoding='utf-8')
+    text, encoding = decode(data)
+
+The encoding is found as in the HTML specification:
+
+1. A byte order mark for UTF-8, UTF-16LE or UTF-16BE.
+2. The `encoding` given by the caller, for instance the one of the
+   `Content-Type` header of the response, if Python knows it.
+3. A `<meta charset>` or `<meta http-equiv="content-type">` element
+   in the first `PRESCAN` bytes. The prescan works on the bytes and
+   skips comments. UTF-16 declared in a `<meta>` means UTF-8.
+4. UTF-8 if the data is valid UTF-8, `windows-1252` otherwise.
+
+Files are mapped in memory and decoded from the map. Whether data
+without a known encoding is valid UTF-8 is checked `CHUNK` bytes at a
+time, so the data is decoded only once, and a byte order mark is
+skipped by the codec rather than by slicing the data. Bytes which are
+not valid in the encoding are replaced by `U+FFFD`.
+
+In Python 3 the only full copy of the document is its decoded text.
+In Python 2 the node parsers work on byte strings: valid UTF-8 or
+ASCII data is parsed as it is, only a file or a `bytearray` is copied
+into a string, and data in other encodings is decoded and encoded
+again in UTF-8.
+
+"""
+
+import re
+import mmap
+import codecs
+from lexor.core.parser import Parser
+
+# Number of bytes examined for a `<meta>` declaring the encoding.
+PRESCAN = 4096
+
+# Number of bytes checked at a time when validating the data.
+CHUNK = 1 << 16
+
+# The encodings whose data is parsed without decoding it in Python 2.
+NATIVE = ('utf-8', 'ascii')
+
+BOMS = (
+    (codecs.BOM_UTF8, 'utf-8'),
+    (codecs.BOM_UTF16_LE, 'utf-16-le'),
+    (codecs.BOM_UTF16_BE, 'utf-16-be'),
+)
+# The codecs which skip the byte order mark of an encoding.
+BOM_CODECS = {'utf-8': 'utf-8-sig', 'utf-16-le': 'utf-16',
+              'utf-16-be': 'utf-16'}
+RE_META = re.compile(br'<!--.*?-->|<meta(?=[\s/])([^>]*)', re.I | re.S)
+RE_ATTRIBUTE = re.compile(
+    br'([^\s/>=]+)\s*(?:=\s*("[^"]*"|\'[^\']*\'|[^\s>]*))?'
+)
+RE_CHARSET = re.compile(br'charset\s*=\s*["\']?([^\s"\';]+)', re.I)
+
+
+def sniff(data, encoding=None):
+    """Return the name of the encoding of `data`, a bytes-like object,
+    and the length of its byte order mark. """
+    for bom, name in BOMS:
+        if data[:len(bom)] == bom:
+            return name, len(bom)
+    if encoding is not None and _lookup(encoding) is not None:
+        return _lookup(encoding), 0
+    found = prescan(bytes(data[:PRESCAN]))
+    if found is not None:
+        return found, 0
+    return None, 0
+
+
+def prescan(data):
+    """Return the encoding declared by a `<meta>` element in `data` or
+    None. """
+    for match in RE_META.finditer(data):
+        if match.group(1) is None:
+            continue
+        attributes = dict()
+        for item in RE_ATTRIBUTE.finditer(match.group(1)):
+            key = item.group(1).lower()
+            if key not in attributes:
+                attributes[key] = (item.group(2) or b'').strip(b'"\'')
+        name = attributes.get(b'charset')
+        if name is None and \
+                attributes.get(b'http-equiv', b'').lower() == b'content-type':
+            found = RE_CHARSET.search(attributes.get(b'content', b''))
+            if found is not None:
+                name = found.group(1)
+        if not name:
+            continue
+        name = _lookup(name.decode('ascii', 'replace'))
+        if name is None:
+            continue
+        if name.startswith('utf-16'):
+            name = 'utf-8'
+        return name
+    return None
+
+
+def _lookup(name):
+    """Return the normalized name of an encoding or None if Python
+    does not know it. """
+    try:
+        return codecs.lookup(name.strip()).name
+    except LookupError:
+        return None
+
+
+def decode(data, encoding=None):
+    """Return the text of `data`, a bytes-like object, and the name of
+    its encoding. """
+    name, skip, _ = _encoding(data, encoding)
+    return _decode(data, name, skip), name
+
+
+def decode_file(path, encoding=None):
+    """Return the text of the file at `path` and the name of its
+    encoding. """
+    return _read(path, decode, encoding)
+
+
+def parse_file(path, defaults=None, uri=None, encoding=None, parser=None):
+    """Parse the file at `path` with the `default` style and return the
+    document and the log of the parse. The uri is the path unless
+    `uri` is given. A `Parser` may be given in `parser` to use it
+    instead of a new one, `defaults` is then ignored. """
+    text, _ = _read(path, _text, encoding)
+    if uri is None:
+        uri = path
+    return _parse(text, defaults, uri, parser)
+
+
+def parse_bytes(data, defaults=None, uri=None, encoding=None,
+                parser=None):
+    """Parse a bytes-like object with the `default` style and return
+    the document and the log of the parse, see `parse_file`. """
+    text, _ = _text(data, encoding)
+    return _parse(text, defaults, uri, parser)
+
+
+def _valid(data, name, start=0):
+    """Return True if `data` from `start` on is valid in the encoding
+    `name`. The data is decoded `CHUNK` bytes at a time. """
+    decoder = codecs.getincrementaldecoder(name)()
+    try:
+        for index in range(start, len(data), CHUNK):
+            decoder.decode(data[index:index+CHUNK])
+        decoder.decode(b'', True)
+    except UnicodeDecodeError:
+        return False
+    return True
+
+
+def _encoding(data, encoding):
+    """Return the encoding of `data`, the length of its byte order mark
+    and whether the data is known to be valid in the encoding. """
+    name, skip = sniff(data, encoding)
+    if name is not None:
+        return name, skip, False
+    if _valid(data, 'utf-8'):
+        return 'utf-8', 0, True
+    return 'cp1252', 0, False
+
+
+def _text(data, encoding):
+    """Return the string given to the node parsers for `data` and the
+    name of its encoding. """
+    if str is not bytes:
+        return decode(data, encoding)
+    name, skip, checked = _encoding(data, encoding)
+    if name not in NATIVE or not (checked or _valid(data, name, skip)):
+        return _decode(data, name, skip).encode('utf-8'), name
+    if skip or not isinstance(data, bytes):
+        # A slice of a memory map is a string.
+        data = data[skip:]
+    return bytes(data), name
+
+
+def _decode(data, name, skip):
+    """Decode `data` in the encoding `name` after a byte order mark of
+    `skip` bytes. """
+    if skip:
+        return codecs.decode(data, BOM_CODECS[name], 'replace')
+    return codecs.decode(data, name, 'replace')
+
+
+def _read(path, function, encoding):
+    """Map the file at `path` in memory and return the result of
+    `function` called with its content and `encoding`. """
+    with open(path, 'rb') as handle:
+        try:
+            data = mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            # Empty files cannot be mapped.
+            return function(b'', encoding)
+    try:
+        return function(data, encoding)
+    finally:
+        data.close()
+
+
+def _parse(text, defaults, uri, parser):
+    """Parse a string returned by `_text`, see `parse_file`. """
+    if parser is None:
+        parser = Parser('html', 'default', defaults)
+    parser.parse(text, uri)
+    return parser.doc, parser.log
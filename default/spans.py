@@ -0,0 +1,76 @@
+"""HTML: SPAN nodes
+
+When the parser option `text_spans` is set to `'true'` the nodes
+holding character data do not copy their content out of the text.
+Instead they keep a reference to the text and the indices where the
+content starts and ends. The string is created the first time the
+`data` of the node is read.
+
+Short contents are copied anyway since the reference and the indices
+take more memory than a short string.
+
+"""
+
+from lexor.core.elements import CharacterData
+
+DATA = CharacterData.__dict__['data']
+MIN_LENGTH = 64
+CLASSES = dict()
+
+
+class SpanData(object):
+    """Mixin for nodes whose data may be a span of the text. """
+
+    __slots__ = ()
+
+    @property
+    def data(self):
+        """The character data of the node. """
+        if self.span_ is not None:
+            self.load_data()
+        return DATA.__get__(self, type(self))
+
+    @data.setter
+    def data(self, value):
+        """Setter function for data. """
+        self.span_ = None
+        DATA.__set__(self, value)
+
+    def load_data(self):
+        """Copy the span of the text into the node. """
+        text, start, end = self.span_
+        self.span_ = None
+        DATA.__set__(self, text[start:end])
+
+
+def span_class(cls):
+    """Return the subclass of `cls` which may hold a span. """
+    try:
+        return CLASSES[cls]
+    except KeyError:
+        pass
+    new_cls = type('Span' + cls.__name__, (SpanData, cls), {
+        '__slots__': ('span_',),
+        '__doc__': '`%s` which may hold a span. ' % cls.__name__,
+    })
+    CLASSES[cls] = new_cls
+    return new_cls
+
+
+def set_span(parser, node, start, end):
+    """Set the data of a node created with `span_class`. """
+    if parser.text_spans and end - start >= MIN_LENGTH:
+        node.span_ = (parser.text, start, end)
+    else:
+        node.data = parser.text[start:end]
+
+
+def make(parser, cls, start, end, *args):
+    """Return a node of class `cls` whose data is the text between
+    `start` and `end`. The arguments `args` are given to `cls` before
+    the data. """
+    if parser.text_spans and end - start >= MIN_LENGTH:
+        node = span_class(cls)(*args)
+        node.span_ = (parser.text, start, end)
+        return node
+    return cls(*(args + (parser.text[start:end],)))
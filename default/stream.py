@@ -0,0 +1,153 @@
+"""HTML: STREAM parser
+
+The `StreamParser` reads a document in pieces. Every piece given to
+`feed` is appended to a buffer which is parsed as `partial` input:
+when a node parser reaches the end of the buffer and the rest of the
+node may still arrive it raises `NeedMoreInput` instead of reporting
+an unterminated node.
+
+While parsing, the dispatcher records a checkpoint each time it is
+called at the top level of the document. The nodes before the last
+checkpoint are complete, they are detached from the document and
+returned by `feed`, the text they were made from is dropped from the
+buffer and the parser remembers the position where the buffer now
+starts. The buffer only holds the last top level node that has not
+been closed and whatever follows it.
+
+To avoid parsing a long unfinished node over and over, the buffer is
+parsed again only after it has doubled in size, this makes the total
+work linear in the length of the input.
+
+    parser = StreamParser()
+    for chunk in chunks:
+        for node in parser.feed(chunk):
+            ...
+    for node in parser.close():
+        ...
+
+The messages of the nodes that have been returned are collected in
+`parser.stream_log`. The messages released so far are counted in
+`message_count` and each parse of the buffer starts from these counts,
+so that `message_limit` applies to the whole document and not to each
+parse of the buffer.
+
+"""
+
+from lexor.command.lang import map_explanations
+from lexor.core.parser import Parser
+from lexor.core.elements import Document, Text
+
+# The parser reports the nodes it cannot close with the name of the
+# module of its class.
+from lexor.core.parser import MSG, MSG_EXPLANATION
+
+
+class NeedMoreInput(Exception):
+    """Raised by the node parsers when they reach the end of partial
+    input and cannot decide what node to create. """
+    pass
+
+
+class StreamParser(Parser):
+    """Parses html given in pieces with the `default` style. """
+
+    def __init__(self, defaults=None, uri=None):
+        Parser.__init__(self, 'html', 'default', defaults)
+        if uri is None:
+            uri = 'stream@0x%x' % id(self)
+        self.stream_uri = uri
+        self.buffer = ''
+        self.start_pos = (1, 1)
+        self.partial = True
+        self.threshold = 0
+        self.mark = None
+        self.stream_log = Document("lexor", "log")
+        self.stream_log.modules = dict()
+        self.stream_log.explanation = dict()
+        self.message_count = dict()
+
+    def need_input(self):
+        """Called by the node parsers when they cannot continue. """
+        raise NeedMoreInput()
+
+    def checkpoint(self):
+        """Called by the dispatcher at the top level of the document.
+        Remember the state of the parser unless the last node is a
+        `Text` node, which may still be extended. """
+        doc = self.doc
+        if doc.child and isinstance(doc.child[-1], Text):
+            return
+        self.mark = (self.caret, len(doc.child), len(self.log.child),
+                     tuple(self.pos))
+
+    def feed(self, text):
+        """Append `text` to the input and return a list with the top
+        level nodes that have been completed. """
+        self.buffer += text
+        if len(self.buffer) < self.threshold:
+            return []
+        return self._consume()
+
+    def close(self):
+        """Parse the rest of the input and return the remaining top
+        level nodes. """
+        self.partial = False
+        nodes = self._consume()
+        map_explanations(self.stream_log.modules,
+                         self.stream_log.explanation)
+        return nodes
+
+    def _consume(self):
+        """Parse the buffer and release the completed nodes. """
+        self.mark = None
+        try:
+            self.parse(self.buffer, self.stream_uri)
+        except NeedMoreInput:
+            pass
+        else:
+            if not self.partial:
+                self.mark = (self.end, len(self.doc.child),
+                             len(self.log.child), tuple(self.pos))
+            elif not self._in_progress:
+                self.checkpoint()
+        if self.mark is None or (self.partial and self.mark[1] == 0):
+            self.threshold = 2 * len(self.buffer)
+            return []
+        caret, num, num_msg, pos = self.mark
+        total = len(self.log.child)
+        nodes = self.doc.child[:num]
+        for node in nodes:
+            _detach(node)
+        if num:
+            del self.doc[0:num]
+        msgs = self.log.child[:num_msg] + self.log.child[total:]
+        if len(self.log.child) > total:
+            del self.log[total:]
+        if num_msg:
+            del self.log[0:num_msg]
+        for msg in msgs:
+            key = (msg['module'], msg['code'])
+            self.message_count[key] = self.message_count.get(key, 0) + 1
+        self.stream_log.extend_children(msgs)
+        self.stream_log.modules.update(self.log.modules)
+        self.buffer = self.buffer[caret:]
+        self.start_pos = pos
+        self.threshold = 2 * len(self.buffer)
+        return nodes
+
+
+def _detach(node):
+    """Make sure that `node` and its descendants do not keep a
+    reference to the text of the buffer. """
+    stack = [node]
+    while stack:
+        node = stack.pop()
+        if getattr(node, 'lazy_', None) is not None:
+            node.validate()
+        if getattr(node, 'span_', None) is not None:
+            node.load_data()
+        pos = getattr(node, 'pos', None)
+        if getattr(pos, 'offset', None) is not None:
+            node.pos = tuple(pos)
+        if node.child:
+            stack.extend(reversed(node.child))
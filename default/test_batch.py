@@ -0,0 +1,43 @@
+"""HTML: DEFAULT parser BATCH test
+
+Testing suite to parse many html documents in worker processes.
+
+"""
+
+from nose.tools import eq_
+from lexor.command.lang import get_style_module
+
+TEXTS = [
+    '<p>%d <a href=%d>link</a></p><!-- %d -->' % (num, num, num)
+    for num in range(7)
+] + ['<ul><li>a<li>b</ul></q>', '', '<br/>&amp']
+
+
+def _result(doc, messages):
+    """Return a list describing a compact document and its messages.
+    """
+    nodes = [(doc.name(index), doc.data(index), doc.attributes(index))
+             for index in range(1, len(doc))]
+    return nodes, [(code, tuple(position), [str(arg) for arg in arg])
+                   for _, code, position, arg in messages]
+
+
+def test_batch():
+    """html.parser.default.batch: parse_many """
+    style = get_style_module('parser', 'html', 'default')
+    batch = style.MOD['batch']
+    expected = list()
+    for text in TEXTS:
+        doc, log = style.parse_compact(text)
+        expected.append(_result(doc, batch.pack_log(log)))
+    results = list(style.parse_many(TEXTS, workers=2, chunksize=3))
+    eq_([index for index, _, _ in results], list(range(len(TEXTS))))
+    eq_([_result(doc, messages) for _, doc, messages in results],
+        expected)
+    log = batch.make_log(results[7][2])
+    eq_([msg['code'] for msg in log], ['W100', 'E101'])
+    results = style.parse_many(iter(TEXTS), workers=2, chunksize=2,
+                               ordered=False)
+    eq_(sorted((index, _result(doc, messages))
+               for index, doc, messages in results),
+        list(enumerate(expected)))
@@ -0,0 +1,61 @@
+"""HTML: DEFAULT parser CACHE test
+
+Testing suite to reuse the documents and elements parsed in the
+default style.
+
+"""
+
+from nose.tools import eq_
+from lexor.core.parser import Parser
+from lexor.core.elements import Element
+from lexor.command.lang import get_style_module
+
+NAV = """<nav class=top>
+<a href="/">home</a> | <a href="/news">news</a> <p>stray
+</nav>"""
+
+TEXT = """<!DOCTYPE html>
+%s
+<div id=a>one &amp; two</div>
+  %s<p>three</q>
+""" % (NAV, NAV)
+
+
+def _tree(node):
+    """Return a list describing the children of a node. """
+    desc = list()
+    for child in node.child:
+        if isinstance(child, Element):
+            desc.append((child.name, child.items(),
+                         tuple(getattr(child, 'pos', ()))))
+            if child.child is not None:
+                desc.append(_tree(child))
+        else:
+            desc.append((child.name, child.data, child.node_position))
+    return desc
+
+
+def _log(log):
+    """Return a list describing the messages in the log. """
+    return [(msg['code'], list(msg['position']),
+             [str(arg) for arg in msg['arg']]) for msg in log]
+
+
+def test_cache():
+    """html.parser.default.cache: documents and fragments """
+    style = get_style_module('parser', 'html', 'default')
+    parser = style.CachingParser(size=1)
+    expected = Parser('html', 'default')
+    expected.parse(TEXT)
+    for _ in range(3):
+        parser.parse(TEXT)
+        eq_(_tree(parser.doc), _tree(expected.doc))
+        eq_(_log(parser.log), _log(expected.log))
+        parser.doc[0].data = 'changed'
+    stats = parser.stats()
+    eq_((stats['misses'], stats['hits']), (2, 1))
+    eq_((stats['fragment_misses'], stats['fragment_hits']), (5, 3))
+    parser.parse(NAV)
+    eq_(parser.stats()['evictions'], 0)
+    parser.parse(NAV)
+    eq_(parser.stats()['evictions'], 1)
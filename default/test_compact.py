@@ -0,0 +1,52 @@
+"""HTML: DEFAULT parser COMPACT test
+
+Testing suite to store html parsed in the default style in arrays.
+
+"""
+
+from nose.tools import eq_
+from lexor.core.parser import Parser
+from lexor.core.elements import Element
+from lexor.command.lang import get_style_module
+
+TEXT = """<!DOCTYPE html>
+<ul><li>one<li class=b>two</ul>
+<p>a <br/> &amp; b<div id="c">c</div><!-- d -- e --><?php f ?>
+<title>g</title></q>h
+"""
+
+
+def _tree(node):
+    """Return a list describing the children of a node. """
+    desc = list()
+    for child in node.child:
+        if isinstance(child, Element):
+            desc.append((child.name, child.items()))
+            if child.child is not None:
+                desc.append(_tree(child))
+        else:
+            desc.append((child.name, child.data))
+    return desc
+
+
+def test_compact():
+    """html.parser.default.compact: arrays and views """
+    style = get_style_module('parser', 'html', 'default')
+    doc, log = style.parse_compact(TEXT)
+    eq_([doc.name(index) for index in doc.children(0)], [
+        '#doctype', '#text', 'ul', '#text', 'p', 'div', '#comment',
+        '?php', '#text', 'title', '#text'
+    ])
+    eq_([doc.get(index, 'class') for index in doc.find_all('li')],
+        ['', 'b'])
+    div = doc.view(list(doc.find_all('div'))[0])
+    eq_(div['id'], 'c')
+    eq_(div.first_child.data, 'c')
+    eq_(div.prev.name, 'p')
+    eq_(div.next.data, ' d -  e ')
+    eq_(div.parent.name, '#document')
+    eq_(div.node_position, (3, 19))
+    parser = Parser('html', 'default')
+    parser.parse(TEXT)
+    eq_(_tree(doc.to_document()), _tree(parser.doc))
+    eq_([msg['code'] for msg in log], [msg['code'] for msg in parser.log])
@@ -4,6 +4,9 @@ Testing suite to parse html element in the default style.
 
 """
 
+import time
+from nose.tools import eq_, ok_
+from lexor.core.parser import Parser
 from lexor.command.test import nose_msg_explanations
 
 
@@ -12,3 +15,93 @@ def test_element():
     nose_msg_explanations(
         'html', 'parser', 'default', 'element'
     )
+
+
+def _parse_time(parser, num):
+    """Best time out of three to parse `num` unterminated tags. """
+    text = '<x' * num + ' ' * (50 * num) + '>'
+    best = None
+    for _ in range(3):
+        start = time.time()
+        parser.parse(text)
+        total = time.time() - start
+        if best is None or total < best:
+            best = total
+    return best
+
+
+def test_unterminated_linear():
+    """html.parser.default.element: unterminated `<` is linear """
+    parser = Parser('html', 'default')
+    small = _parse_time(parser, 1000)
+    large = _parse_time(parser, 8000)
+    ok_(large < 20 * small, "parse time grows faster than linearly")
+
+
+def test_lazy_attributes():
+    """html.parser.default.element: lazy attributes """
+    parser = Parser('html', 'default', {'lazy_attributes': 'true'})
+    parser.parse('<tag att1="val1"att2="val2">content</tag>')
+    node = parser.doc[0]
+    eq_(len(parser.log), 0)
+    eq_(node['att2'], 'val2')
+    eq_(node.attributes, ['att1', 'att2'])
+    eq_([msg['code'] for msg in parser.log], ['E130'])
+    node.validate()
+    eq_(len(parser.log), 1)
+
+
+def test_lazy_attributes_two_parsers():
+    """html.parser.default.element: lazy attributes after a reload """
+    first = Parser('html', 'default', {'lazy_attributes': 'true'})
+    first.parse('<a href=x>1</a>')
+    second = Parser('html', 'default', {'lazy_attributes': 'true'})
+    second.parse('<a href=y>2</a>')
+    first.parse('<a href=x>1</a>')
+    eq_(first.doc[0]['href'], 'x')
+    eq_(first.doc[0].get('title', 'none'), 'none')
+    ok_('href' in first.doc[0])
+    eq_(second.doc[0]['href'], 'y')
+
+
+def test_text_spans():
+    """html.parser.default.element: text spans """
+    text = 'x' * 100
+    html = '<p>%s</p><script>%s</script><!--%s--><![CDATA[%s]]>' % (
+        (text,) * 4
+    )
+    parser = Parser('html', 'default', {'text_spans': 'true'})
+    parser.parse(html)
+    nodes = [parser.doc[0][0], parser.doc[1], parser.doc[2], parser.doc[3]]
+    for node in nodes:
+        ok_(node.span_ is not None)
+        eq_(node.data, text)
+        ok_(node.span_ is None)
+    node = parser.doc[0][0]
+    node.data = 'y'
+    eq_(node.data, 'y')
+
+
+def test_open_elements():
+    """html.parser.default.element: closing the open elements """
+    parser = Parser('html', 'default')
+    parser.parse('<div><p><b><x <y>')
+    codes = [msg['code'] for msg in parser.log
+             if msg['module'].endswith('element')]
+    eq_(codes, ['E100'])
+    parser.parse('<p>a<b>b<div>c</div>')
+    eq_([node.name for node in parser.doc], ['p', 'div'])
+    eq_([msg['arg'][0] for msg in parser.log], ['b'])
+    parser.parse('<section><div><span><i>a</section>b')
+    eq_(parser.doc[1].data, 'b')
+    eq_([msg['code'] for msg in parser.log], ['W100'] * 3)
+
+
+def test_stray_end_tags():
+    """html.parser.default.element: stray end tags """
+    num = 1000
+    parser = Parser('html', 'default', {'instrument': 'true'})
+    parser.parse('<div>' * num + '</span>' * num)
+    stats = parser.instrumentation.report['node_parsers']
+    eq_(sum(item['close_attempts'] for item in stats.values()), 0)
+    eq_(len(parser.log), 2 * num)
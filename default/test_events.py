@@ -0,0 +1,60 @@
+"""HTML: DEFAULT parser EVENTS test
+
+Testing suite to generate the events of html in the default style.
+
+"""
+
+from nose.tools import eq_
+from lexor.command.lang import get_style_module
+
+TEXT = """<!DOCTYPE html>
+<ul><li>one<li class=b>two</ul>
+<p>a <br/> &amp; b<div>c</div><!-- d --><![CDATA[e]]><?php f ?>
+<title>g</title></q>h
+"""
+
+
+def test_events():
+    """html.parser.default.events: events of a document """
+    style = get_style_module('parser', 'html', 'default')
+    parser = style.EventParser()
+    events = list()
+    for event, val in parser.events(TEXT):
+        if event == 'start':
+            events.append((event, val.name, val.attributes(), val.data))
+        elif event == 'end':
+            events.append((event, val.name))
+        else:
+            events.append((event, val))
+    eq_(events, [
+        ('doctype', 'html'),
+        ('text', '\n'),
+        ('start', 'ul', [], None),
+        ('start', 'li', [], None),
+        ('text', 'one'),
+        ('end', 'li'),
+        ('start', 'li', [('class', 'b')], None),
+        ('text', 'two'),
+        ('end', 'li'),
+        ('end', 'ul'),
+        ('text', '\n'),
+        ('start', 'p', [], None),
+        ('text', 'a '),
+        ('start', 'br', [], None),
+        ('end', 'br'),
+        ('text', ' '),
+        ('entity', '&amp;'),
+        ('text', ' b'),
+        ('end', 'p'),
+        ('start', 'div', [], None),
+        ('text', 'c'),
+        ('end', 'div'),
+        ('comment', ' d '),
+        ('cdata', 'e'),
+        ('pi', ('?php', 'f ')),
+        ('text', '\n'),
+        ('start', 'title', [], 'g'),
+        ('end', 'title'),
+        ('text', 'h\n'),
+    ])
+    eq_([msg['code'] for msg in parser.log], ['W100', 'E101'])
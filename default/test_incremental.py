@@ -0,0 +1,91 @@
+"""HTML: DEFAULT parser INCREMENTAL test
+
+Testing suite to parse edited html in the default style.
+
+"""
+
+from nose.tools import eq_, ok_
+from lexor.core.parser import Parser
+from lexor.core.elements import Element
+from lexor.command.lang import get_style_module
+
+TEXT = """<!DOCTYPE html>
+<div id=a><p>one &amp; two</p><!-- a --><ul><li>x<li>y</ul></div>
+<div id=b><p>three <b>four</b></p></div>
+<p>five</q>
+"""
+
+
+def _tree(node):
+    """Return a list describing the children of a node. """
+    desc = list()
+    for child in node.child:
+        if isinstance(child, Element):
+            desc.append((child.name, child.items()))
+            if child.child is not None:
+                desc.append(_tree(child))
+        else:
+            desc.append((child.name, child.data))
+    return desc
+
+
+def _log(log):
+    """Return a list describing the messages in the log. """
+    return [(msg['code'], list(msg['position']),
+             [str(arg) for arg in msg['arg']]) for msg in log]
+
+
+def test_incremental():
+    """html.parser.default.incremental: edits """
+    style = get_style_module('parser', 'html', 'default')
+    parser = style.IncrementalParser()
+    parser.parse(TEXT)
+    doc = parser.doc
+    text = TEXT
+    last = doc[4]
+    start = parser.span(last)[0]
+    expected = Parser('html', 'default')
+    for target, removed, inserted in [('one', 3, 'ONE\n'),
+                                      ('</ul>', 0, '<li>z'),
+                                      ('two', 0, '<b>'),
+                                      ('</q>', 4, '')]:
+        offset = text.index(target)
+        text = text[:offset] + inserted + text[offset+removed:]
+        parser.edit(offset, removed, inserted)
+        expected.parse(text)
+        eq_(_tree(parser.doc), _tree(expected.doc))
+        eq_(_log(parser.log), _log(expected.log))
+    ok_(parser.doc[4] is last)
+    eq_(parser.span(last)[0], start + 1 + 5 + 3)
+    eq_(parser.position(last), tuple(expected.doc[4].pos))
+
+
+def test_incremental_has_element():
+    """html.parser.default.incremental: element seen before the joint """
+    style = get_style_module('parser', 'html', 'default')
+    text = '<ul><li><b>x</b> one<li>two</ul>'
+    parser = style.IncrementalParser()
+    parser.parse(text)
+    offset = text.index('<b>')
+    parser.edit(offset, len('<b>x</b>'), 'x')
+    expected = Parser('html', 'default')
+    expected.parse('<ul><li>x one<li>two</ul>')
+    eq_(_tree(parser.doc), _tree(expected.doc))
+    eq_(_log(parser.log), _log(expected.log))
+
+
+def test_incremental_lines():
+    """html.parser.default.incremental: line index after edits """
+    style = get_style_module('parser', 'html', 'default')
+    lines = style.MOD['lines']
+    parser = style.IncrementalParser()
+    parser.parse(TEXT)
+    text = TEXT
+    for offset, removed, inserted in [(20, 0, '\n\n'), (5, 30, 'a\nb'),
+                                      (60, 2, ''), (3, 0, '\n'),
+                                      (40, 10, '<p>\n')]:
+        text = text[:offset] + inserted + text[offset+removed:]
+        parser.edit(offset, removed, inserted)
+        index = lines.LineIndex(text)
+        eq_([parser.lines.position(num) for num in range(len(text) + 1)],
+            [index.position(num) for num in range(len(text) + 1)])
@@ -0,0 +1,46 @@
+"""HTML: DEFAULT parser INSTRUMENT test
+
+Testing suite to count and time the calls to the node parsers of the
+default style.
+
+"""
+
+from nose.tools import eq_, ok_
+from lexor.core.parser import Parser
+
+TEXT = """<!DOCTYPE html>
+<p>a &amp; b <!-- c -- d --><ul><li>e<li>f</ul></span>
+"""
+
+
+def test_instrument():
+    """html.parser.default.instrument: report and hooks """
+    parser = Parser('html', 'default', {'instrument': 'true'})
+    reports = list()
+    parser.parse(TEXT)
+    instrument = parser.style_module.MOD['instrument']
+    instrument.add_hook(parser, lambda crt, report: reports.append(report))
+    parser.parse(TEXT)
+    report = parser.instrumentation.report
+    eq_(reports, [report])
+    eq_(report['chars'], len(TEXT))
+    stats = report['node_parsers']
+    element = stats['ElementNP']
+    eq_((element['attempts'], element['hits'], element['misses']), (4, 4, 0))
+    eq_(element['close_attempts'], stats['DispatchNP']['close_attempts'])
+    eq_(element['close_hits'], 3)
+    eq_(stats['DispatchNP']['chars'], 0)
+    eq_(stats['CommentNP']['hits'], 1)
+    eq_(stats['EntityNP']['attempts'], 2)
+    for entry in stats.values():
+        eq_(entry['attempts'], entry['hits'] + entry['misses'])
+        ok_(entry['seconds'] >= 0)
+    eq_(report['messages']['EntityNP'], {'E101': 1})
+    eq_(report['messages']['CommentNP'], {'E301': 1})
+    parser.parse(TEXT)
+    eq_(len(reports), 2)
+    parser.defaults['instrument'] = 'false'
+    parser.parse(TEXT)
+    eq_(parser.instrumentation, None)
+    ok_('make_node' not in parser['ElementNP'].__dict__)
+    eq_(len(reports), 2)
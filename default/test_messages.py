@@ -0,0 +1,23 @@
+"""HTML: DEFAULT parser MESSAGES test
+
+Testing suite for the options which turn off or cap the messages of
+the node parsers in the default style.
+
+"""
+
+from nose.tools import eq_
+from lexor.core.parser import Parser
+
+
+def test_message_options():
+    """html.parser.default.messages: messages and message_limit """
+    text = 'a & b & c < d'
+    parser = Parser('html', 'default', {'messages': 'false'})
+    parser.parse(text)
+    eq_(len(parser.log), 0)
+    parser = Parser('html', 'default', {'message_limit': '1'})
+    parser.parse(text)
+    eq_([msg['arg'] for msg in parser.log], [['&']])
+    parser = Parser('html', 'default')
+    parser.parse(text)
+    eq_(len(parser.log), 3)
@@ -0,0 +1,48 @@
+"""HTML: DEFAULT parser PARALLEL test
+
+Testing suite to parse a large html document in worker processes.
+
+"""
+
+from nose.tools import eq_, ok_
+from lexor.command.lang import get_style_module
+
+BLOCK = """<div id=a><p>one &amp; two<p>three <b>four</b></div>
+<ul><li>x<li>y</ul><script>if (a < b) { c = "<p>"; }</script>
+<!-- <div> --><table><tr><td>1<td>2</table><p>five</q>
+"""
+
+ARRAYS = ('kind', 'parent', 'first_child', 'next_sibling', 'start',
+          'end', 'data_start', 'data_length', 'attribute_start',
+          'attribute_end')
+
+
+def _arrays(doc):
+    """Return a list describing a `CompactDocument`. """
+    desc = [list(getattr(doc, name)) for name in ARRAYS]
+    desc.append([doc.name(index) for index in range(len(doc))])
+    desc.append([doc.attributes(index) for index in range(len(doc))])
+    return desc
+
+
+def _log(log):
+    """Return a list describing the messages in the log. """
+    return [(msg['code'], list(msg['position']), msg['uri'],
+             [str(arg) for arg in msg['arg']]) for msg in log]
+
+
+def test_parallel():
+    """html.parser.default.parallel: segments """
+    style = get_style_module('parser', 'html', 'default')
+    parallel = style.MOD['parallel']
+    count = 3 * parallel.MIN_SEGMENT // len(BLOCK) + 1
+    text = '<html><body>\n' + BLOCK * count
+    splits = parallel.find_splits(text, 3)
+    eq_(len(splits), 2)
+    for index, state in splits:
+        ok_(text.startswith('<', index))
+        eq_(state, (('html', True), ('body', True)))
+    doc, log = style.parse_compact(text)
+    pdoc, plog = style.parse_parallel(text, workers=2, segments=3)
+    eq_(_arrays(pdoc), _arrays(doc))
+    eq_(_log(plog), _log(log))
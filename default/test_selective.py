@@ -0,0 +1,42 @@
+"""HTML: DEFAULT parser SELECTIVE test
+
+Testing suite to parse only some html elements in the default style.
+
+"""
+
+from nose.tools import eq_
+from lexor.command.lang import get_style_module
+
+TEXT = """<html><head><title>a <a href=1></title>
+<link rel=icon href=i.png><meta charset=utf-8></head>
+<body><!-- <a href=2> --><script>"<a href=3>"</script>
+<p>b <a name=c>c</a> <a href=d>d <b>e</b></a>
+<![CDATA[<a href=4>]]></body></html>
+"""
+
+
+def test_selective():
+    """html.parser.default.selective: selected elements """
+    style = get_style_module('parser', 'html', 'default')
+    parser = style.SelectiveParser()
+    doc = parser.select(TEXT, ['a', 'link', 'META'])
+    eq_([(node.name, node.items()) for node in doc], [
+        ('link', [('rel', 'icon'), ('href', 'i.png')]),
+        ('meta', [('charset', 'utf-8')]),
+        ('a', [('name', 'c')]),
+        ('a', [('href', 'd')]),
+    ])
+    eq_([node.name for node in doc[3]], ['#text', 'b'])
+    eq_(doc[3].pos, (4, 22))
+    doc = parser.select(TEXT, ['a', 'link'], ['href'])
+    eq_([node['href'] for node in doc], ['i.png', 'd'])
+
+
+def test_selective_ancestors():
+    """html.parser.default.selective: unseen ancestors """
+    style = get_style_module('parser', 'html', 'default')
+    parser = style.SelectiveParser()
+    doc = parser.select('<div><a href=x>foo</span>bar</a></div>', ['a'])
+    eq_([node.data for node in doc[0]], ['foo'])
+    doc = parser.select('<p><b>x<div>y</div></b>', ['b'])
+    eq_([node.name for node in doc[0]], ['#text', 'div'])
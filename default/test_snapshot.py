@@ -0,0 +1,82 @@
+# -*- coding: utf-8 -*-
+"""HTML: DEFAULT parser SNAPSHOT test
+
+Testing suite to save the documents parsed in the default style in
+binary files and load them back.
+
+"""
+
+import os
+import shutil
+import tempfile
+from nose.tools import eq_, ok_, raises
+from lexor.core.parser import Parser
+from lexor.core.elements import Element
+from lexor.command.lang import get_style_module
+
+TEXT = """<!DOCTYPE html>
+<ul><li>café<li class=b title="a &amp; b">two</ul>
+<p>€ <br/> &amp; b<div id="c">c</div><!-- d -- e --><?php f ?>
+<title>g</title></q>h
+"""
+
+ARRAYS = ('kind', 'parent', 'first_child', 'next_sibling', 'start',
+          'end', 'data_start', 'data_length', 'attribute_start',
+          'attribute_end')
+
+
+def _tree(node):
+    """Return a list describing the children of a node. """
+    desc = list()
+    for child in node.child:
+        if isinstance(child, Element):
+            desc.append((child.name, child.items()))
+            if child.child is not None:
+                desc.append(_tree(child))
+        else:
+            desc.append((child.name, child.data))
+    return desc
+
+
+def _arrays(doc):
+    """Return a list describing a `CompactDocument`. """
+    desc = [list(getattr(doc, name)) for name in ARRAYS]
+    for index in range(len(doc)):
+        desc.append((doc.name(index), doc.data(index),
+                     doc.attributes(index), doc.position(index)))
+    return desc
+
+
+def test_snapshot():
+    """html.parser.default.snapshot: save and load """
+    style = get_style_module('parser', 'html', 'default')
+    batch = style.MOD['batch']
+    doc, log = style.parse_compact(TEXT)
+    messages = batch.pack_log(log)
+    ok_(any(isinstance(arg, int) for msg in messages for arg in msg[3]))
+    tmp = tempfile.mkdtemp()
+    try:
+        path = os.path.join(tmp, 'page.snap')
+        style.save_snapshot(path, doc, messages)
+        snap = style.load_snapshot(path)
+        eq_(_arrays(snap), _arrays(doc))
+        eq_([msg[:3] + (repr(msg[3]),) for msg in snap.messages()],
+            [msg[:3] + (repr(list(msg[3])),) for msg in messages])
+        eq_(list(snap.find_all('li')), list(doc.find_all('li')))
+        eq_(snap.view(0).child[2].name, 'ul')
+        parser = Parser('html', 'default')
+        parser.parse(TEXT)
+        eq_(_tree(snap.to_document()), _tree(parser.doc))
+    finally:
+        shutil.rmtree(tmp)
+
+
+@raises(ValueError)
+def test_snapshot_version():
+    """html.parser.default.snapshot: unsupported version """
+    style = get_style_module('parser', 'html', 'default')
+    snapshot = style.MOD['snapshot']
+    doc, _ = style.parse_compact(TEXT)
+    data = snapshot.HEADER.pack(snapshot.MAGIC, snapshot.VERSION + 1)
+    data += b''.join(snapshot.pack(doc))
+    snapshot.SnapshotDocument(data)
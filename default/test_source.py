@@ -0,0 +1,94 @@
+# -*- coding: utf-8 -*-
+"""HTML: DEFAULT parser SOURCE test
+
+Testing suite to parse files and bytes in the default style.
+
+"""
+
+import os
+import shutil
+import tempfile
+from nose.tools import eq_
+from lexor.core.parser import Parser
+from lexor.core.elements import Element
+from lexor.command.lang import get_style_module
+
+TEXT = u"""<!DOCTYPE html>
+<html><head><!-- <meta charset="koi8-r"> -->
+<meta http-equiv="Content-Type" content="text/html; charset=ISO-8859-1">
+</head><body><p>café &amp; crème</body></html>
+"""
+
+# The text given to the parsers, which work on byte strings in Python 2.
+NATIVE = TEXT.encode('utf-8') if str is bytes else TEXT
+
+
+def _tree(node):
+    """Return a list describing the children of a node. """
+    desc = list()
+    for child in node.child:
+        if isinstance(child, Element):
+            desc.append((child.name, child.items()))
+            if child.child is not None:
+                desc.append(_tree(child))
+        else:
+            desc.append((child.name, child.data))
+    return desc
+
+
+def test_sniff():
+    """html.parser.default.source: encodings """
+    style = get_style_module('parser', 'html', 'default')
+    source = style.MOD['source']
+    eq_(source.decode(TEXT.encode('latin-1')), (TEXT, 'iso8859-1'))
+    eq_(source.decode(TEXT.encode('latin-1'), 'utf-8')[1], 'utf-8')
+    data = u'﻿<p>€'.encode('utf-16-le')
+    eq_(source.decode(data), (u'<p>€', 'utf-16-le'))
+    data = u'﻿<p>€'.encode('utf-8')
+    eq_(source.decode(bytearray(data)), (u'<p>€', 'utf-8'))
+    eq_(source.decode(u'<meta charset=utf-16>'.encode('utf-8'))[1],
+        'utf-8')
+    eq_(source.decode(u'<p>€'.encode('utf-8')), (u'<p>€', 'utf-8'))
+    eq_(source.decode(u'<p>€'.encode('cp1252')),
+        (u'<p>€', 'cp1252'))
+    eq_(source.decode(b''), (u'', 'utf-8'))
+    text = u'a' * (source.CHUNK - 1) + u'é'
+    eq_(source.decode(text.encode('utf-8')), (text, 'utf-8'))
+    eq_(source.decode(text.encode('utf-8')[:-1])[1], 'cp1252')
+
+
+def test_parse_file():
+    """html.parser.default.source: files """
+    style = get_style_module('parser', 'html', 'default')
+    parser = Parser('html', 'default')
+    parser.parse(NATIVE)
+    tmp = tempfile.mkdtemp()
+    try:
+        path = os.path.join(tmp, 'page.html')
+        with open(path, 'wb') as handle:
+            handle.write(TEXT.encode('latin-1'))
+        doc, log = style.parse_file(path)
+        eq_(doc.uri_, path)
+        eq_(_tree(doc), _tree(parser.doc))
+        eq_(len(log), len(parser.log))
+        doc, _ = style.parse_file(path.encode('utf-8').decode('utf-8'))
+        eq_(_tree(doc), _tree(parser.doc))
+        open(path, 'wb').close()
+        doc, log = style.parse_file(path)
+        eq_(len(doc), 0)
+    finally:
+        shutil.rmtree(tmp)
+
+
+def test_parse_bytes():
+    """html.parser.default.source: bytes """
+    style = get_style_module('parser', 'html', 'default')
+    parser = Parser('html', 'default')
+    parser.parse(NATIVE)
+    for data, encoding in ((bytearray(TEXT.encode('latin-1')), None),
+                           (TEXT.encode('utf-8'), 'utf-8')):
+        doc, log = style.parse_bytes(data, uri='page.html',
+                                     encoding=encoding)
+        eq_(doc.uri_, 'page.html')
+        eq_(_tree(doc), _tree(parser.doc))
+        eq_(len(log), len(parser.log))
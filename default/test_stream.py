@@ -0,0 +1,70 @@
+"""HTML: DEFAULT parser STREAM test
+
+Testing suite to parse html in pieces in the default style.
+
+"""
+
+from nose.tools import eq_, ok_
+from lexor.core.parser import Parser
+from lexor.core.elements import Element
+from lexor.command.lang import get_style_module
+
+TEXT = """<!DOCTYPE html>
+<p class=note>one &amp; two</p><!-- a -- b -->
+<script>if (a < b) {}</script >
+<ul><li>x<li>y</ul><![CDATA[ ]]> & <?php echo 1; ?>
+<div>
+  <br/><span id="s">z</span></q>
+</div>
+"""
+
+
+def _tree(nodes):
+    """Return a list describing the nodes. """
+    desc = list()
+    for node in nodes:
+        if isinstance(node, Element):
+            desc.append((node.name, node.items(), getattr(node, 'pos', None)))
+            if node.child is not None:
+                desc.append(_tree(node.child))
+        else:
+            desc.append((node.name, node.data))
+    return desc
+
+
+def _log(log):
+    """Return a list describing the messages in the log. """
+    return [(msg['code'], list(msg['position']),
+             [str(arg) for arg in msg['arg']]) for msg in log]
+
+
+def test_stream():
+    """html.parser.default.stream: feed in pieces """
+    parser = Parser('html', 'default')
+    parser.parse(TEXT)
+    expected = _tree(parser.doc.child)
+    style = get_style_module('parser', 'html', 'default')
+    for size in [1, 2, 3, 7, 50]:
+        stream = style.StreamParser()
+        nodes = list()
+        for index in range(0, len(TEXT), size):
+            nodes.extend(stream.feed(TEXT[index:index+size]))
+        ok_(len(nodes) > 0)
+        nodes.extend(stream.close())
+        eq_(_tree(nodes), expected)
+        eq_(_log(stream.stream_log), _log(parser.log))
+
+
+def test_stream_message_limit():
+    """html.parser.default.stream: message_limit over the document """
+    text = '<p>a & b</p>\n' * 20
+    defaults = {'message_limit': '1'}
+    parser = Parser('html', 'default', defaults)
+    parser.parse(text)
+    style = get_style_module('parser', 'html', 'default')
+    for size in [1, 7, 50]:
+        stream = style.StreamParser(defaults)
+        for index in range(0, len(text), size):
+            stream.feed(text[index:index+size])
+        stream.close()
+        eq_(_log(stream.stream_log), _log(parser.log))
@@ -0,0 +1,90 @@
+"""HTML: DEFAULT parser TOKENS test
+
+Testing suite to tokenize html and build documents from the tokens in
+the default style.
+
+"""
+
+from nose.tools import eq_
+from lexor.core.parser import Parser
+from lexor.core.elements import Element
+from lexor.command.lang import get_style_module
+
+TEXT = """<!DOCTYPE html>
+<ul><li>one<li class=b>two</ul>
+<p>a <br/> &amp; b<div>c</div><!-- d --><![CDATA[e]]><?php f ?>
+<title>g</title></q>h & < <!x>
+"""
+
+
+def _tree(node):
+    """Return a list describing the children of a node. """
+    desc = list()
+    for child in node.child:
+        if isinstance(child, Element):
+            desc.append((child.name, child.items()))
+            if child.child is not None:
+                desc.append(_tree(child))
+        else:
+            desc.append((child.name, child.data))
+    return desc
+
+
+def test_tokenize():
+    """html.parser.default.tokens: tokens of a document """
+    style = get_style_module('parser', 'html', 'default')
+    tokens = list(style.tokenize(TEXT))
+    end = 0
+    for _, start, stop, _, _ in tokens:
+        eq_(start, end)
+        end = stop
+    eq_(end, len(TEXT))
+    eq_([(kind, TEXT[first:last]) for kind, _, _, first, last in tokens], [
+        ('doctype', 'html'),
+        ('text', '\n'),
+        ('start', 'ul'),
+        ('start', 'li'),
+        ('text', 'one'),
+        ('start', 'li'),
+        ('text', 'two'),
+        ('end', 'ul'),
+        ('text', '\n'),
+        ('start', 'p'),
+        ('text', 'a '),
+        ('start', 'br'),
+        ('text', ' '),
+        ('entity', '&amp;'),
+        ('text', ' b'),
+        ('start', 'div'),
+        ('text', 'c'),
+        ('end', 'div'),
+        ('comment', ' d '),
+        ('cdata', 'e'),
+        ('pi', 'f '),
+        ('text', '\n'),
+        ('start', 'title'),
+        ('rawtext', 'g'),
+        ('end', 'title'),
+        ('end', 'q'),
+        ('text', 'h '),
+        ('stray', '&'),
+        ('text', ' '),
+        ('stray', '<'),
+        ('text', ' '),
+        ('comment', 'x'),
+        ('text', '\n'),
+    ])
+
+
+def test_tree_builder():
+    """html.parser.default.tokens: tree built from the tokens """
+    style = get_style_module('parser', 'html', 'default')
+    for defaults in (None, {'text_spans': 'true'}):
+        parser = Parser('html', 'default', defaults)
+        parser.parse(TEXT)
+        expected = _tree(parser.doc)
+        codes = [(msg['code'], msg['position']) for msg in parser.log]
+        builder = style.TreeBuilder(defaults)
+        builder.parse(TEXT)
+        eq_(_tree(builder.doc), expected)
+        eq_([(msg['code'], msg['position']) for msg in builder.log], codes)
@@ -0,0 +1,366 @@
+"""HTML: TOKEN stream
+
+The parse of a document may be split in two stages. `tokenize` turns
+the text into a flat stream of tokens and the `TreeBuilder` builds the
+document from the tokens. Code which does not need the document, for
+instance a minifier or a syntax highlighter, only needs the tokens:
+
+    for kind, start, end, first, last in tokenize(text):
+        ...
+
+Each token is a tuple with its kind, the span `text[start:end]` which
+produced it and the span `text[first:last]` of its content. The kinds
+and their content are
+
+    text        the text itself
+    start       the name of the element as written in the text
+    end         the name in the end tag
+    rawtext     the content of a `RAWTEXT_ELEMENT`, it follows its
+                `start` token and is followed by its `end` token if
+                the end tag is found
+    comment     the comment without `<!--` and `-->`, or without `<!`
+                and `>` for a bogus comment
+    cdata       the data without `<![CDATA[` and `]]>`
+    doctype     the declaration without `<!doctype` and `>`
+    pi          the data of the processing instruction, its target
+                is `text[start+1:first-1]`
+    entity      the entity
+    stray       a `<` or `&` which does not start any of the above
+
+The tokens cover the text, each one starts where the previous one
+ends. They are recognized as the node parsers of this style recognize
+the nodes, the patterns are searched in the whole text and no message
+is issued.
+
+The `TreeBuilder` is a `Parser` which builds the same document and
+log as the `default` style from the tokens. It applies the rules of
+`VOID_ELEMENT`, `RAWTEXT_ELEMENT`, `AUTO_CLOSE` and `AUTO_CLOSE_FIRST`
+and reports the same messages:
+
+    parser = TreeBuilder()
+    parser.parse(text)
+
+"""
+
+import re
+from lexor.command.lang import load_rel
+from lexor.core.parser import Parser
+from lexor.core.elements import Text, Entity, Comment, CData, \
+    DocumentType, ProcessingInstruction
+from lexor.util import Position
+
+# The parser reports the nodes it cannot close with the name of the
+# module of its class.
+from lexor.core.parser import MSG, MSG_EXPLANATION
+
+ELEMENT = load_rel(__file__, 'element')
+ENTITY = load_rel(__file__, 'entity')
+BOUNDARY = load_rel(__file__, 'boundary')
+SPANS = load_rel(__file__, 'spans')
+
+RE_SPECIAL = re.compile('[<&]')
+RE_NAME = re.compile('[^ \t\n\r\f\v/>]*')
+RE_SPACE = re.compile('[ \t\n\r\f\v]')
+SPACE = ' \t\n\r\f\v'
+
+
+def tokenize(text):
+    """Generate the tokens of `text`, tuples `(kind, start, end,
+    first, last)`. """
+    end = len(text)
+    boundary = BOUNDARY.Boundary(text)
+    caret = 0
+    while caret < end:
+        match = RE_SPECIAL.search(text, caret)
+        if match is None:
+            yield 'text', caret, end, caret, end
+            return
+        index = match.start(0)
+        if index > caret:
+            yield 'text', caret, index, caret, index
+        if text[index] == '&':
+            token = _read_entity(text, index)
+        else:
+            token = _read_markup(text, index, end, boundary)
+        yield token
+        caret = token[2]
+        if token[0] != 'start':
+            continue
+        name = text[token[3]:token[4]].lower()
+        if name not in ELEMENT.RAWTEXT_ELEMENT:
+            continue
+        match = ELEMENT.RE_RAWTEXT_CLOSE[name].search(text, caret)
+        if match is None:
+            yield 'rawtext', caret, end, caret, end
+            return
+        index = match.start(0)
+        yield 'rawtext', caret, index, caret, index
+        yield 'end', index, match.end(0), index+2, index+2+len(name)
+        caret = match.end(0)
+
+
+def _read_entity(text, index):
+    """Return the token of the `&` at `index`. """
+    if text[index+1:index+2] == '#':
+        match = ENTITY.RE_NUMERIC.match(text, index)
+    else:
+        match = ENTITY.RE_NAMED.match(text, index)
+        if match and match.group(1) not in ENTITY.NAMED_ENTITY:
+            match = None
+    if match is None:
+        return 'stray', index, index+1, index, index+1
+    return 'entity', index, match.end(0), index, match.end(0)
+
+
+def _read_markup(text, index, end, boundary):
+    """Return the token of the `<` at `index`. """
+    char = text[index+1:index+2]
+    if char == '!':
+        return _read_declaration(text, index, end)
+    if char == '?':
+        match = RE_SPACE.search(text, index+1)
+        if match is None:
+            return 'text', index, end, index, end
+        close = text.find('?>', match.end(0))
+        if close == -1:
+            return 'pi', index, end, match.end(0), end
+        return 'pi', index, close+2, match.end(0), close
+    if char == '/':
+        close = boundary.find('>', index+2)
+        if close == -1:
+            return 'stray', index, index+1, index, index+1
+        return 'end', index, close+1, index+2, close
+    if char.isalpha() or char in [":", "_"]:
+        close = boundary.find('>', index+1)
+        other = boundary.find('<', index+1)
+        if close != -1 and (other == -1 or other > close):
+            name = RE_NAME.match(text, index+1).end(0)
+            return 'start', index, close+1, index+1, name
+    return 'stray', index, index+1, index, index+1
+
+
+def _read_declaration(text, index, end):
+    """Return the token of the `<!` at `index`. """
+    if text.startswith('<!--', index):
+        close = text.find('-->', index+4)
+        if close == -1:
+            return 'comment', index, end, index+4, end
+        return 'comment', index, close+3, index+4, close
+    if text.startswith('<![CDATA[', index):
+        close = text.find(']]>', index+9)
+        if close == -1:
+            return 'cdata', index, end, index+9, end
+        return 'cdata', index, close+3, index+9, close
+    if text[index+2:index+9].lower() == 'doctype' and \
+            text[index+9:index+10] in SPACE:
+        first = min(index+10, end)
+        close = text.find('>', first)
+        if close == -1:
+            return 'doctype', index, end, first, end
+        return 'doctype', index, close+1, first, close
+    close = text.find('>', index+2)
+    if close == -1:
+        return 'comment', index, end, index+2, end
+    return 'comment', index, close+1, index+2, close
+
+
+class TreeBuilder(Parser):
+    """Builds the documents of the `default` style from the tokens
+    generated by `tokenize`. """
+
+    def __init__(self, defaults=None):
+        Parser.__init__(self, 'html', 'default', defaults)
+        self.open = ELEMENT.OpenElements()
+
+    def _parse(self):
+        """Main parsing function, it replaces the loop over the node
+        parsers of `Parser._parse`. """
+        self.current_node = crt = self.doc
+        self._in_progress = []
+        tokens = tokenize(self.text)
+        for kind, start, end, first, last in tokens:
+            self.update(start)
+            if kind == 'text':
+                self._add_text(crt, start, end)
+            elif kind == 'start':
+                crt = self._start(crt, tokens, first, last, end)
+            elif kind == 'end':
+                crt = self._end(crt, start, end, first, last)
+            elif kind == 'entity':
+                crt.append_child(Entity(self.text[start:end]))
+            elif kind == 'stray':
+                crt.append_child(self._stray(start))
+            else:
+                crt.append_child(self._character_data(kind, start, end,
+                                                      first, last))
+            if self.caret < end:
+                self.update(end)
+            self.current_node = crt
+        for node, _ in self._in_progress:
+            self.msg(self.__module__, 'E100', node.node_position,
+                     [node.name])
+
+    def _add_text(self, crt, start, end):
+        """Append `text[start:end]` to the last child of `crt` or in a
+        new `Text` node. """
+        position = True
+        if self.text[start] == '<':
+            # A processing instruction without a target, its text does
+            # not receive a position.
+            processor = self['ProcessingInstructionNP']
+            if self.messages.accept(processor, 'E100'):
+                processor.msg('E100', self.pos)
+            position = False
+        if crt.child and isinstance(crt.child[-1], Text):
+            crt.child[-1].data += self.text[start:end]
+            return
+        node = SPANS.make(self, Text, start, end)
+        if position:
+            node.set_position(*self.copy_pos())
+        crt.append_child(node)
+
+    def _close(self, kind, name):
+        """Close the element closed by the tag at the caret and return
+        True, or return False if the tag does not close an element.
+        This follows `ElementNP.closing`. """
+        in_progress = self._in_progress
+        if not in_progress:
+            return False
+        self.open.sync(in_progress)
+        num = len(in_progress) - 1
+        if kind == 'end':
+            num = self.open.innermost(name)
+        else:
+            node = in_progress[num][0]
+            names = ELEMENT.AUTO_CLOSE_FIRST.get(node.name)
+            if node.has_element_ or names is None or name not in names:
+                num = -1
+                for item in ELEMENT.CLOSED_BY.get(name, ()):
+                    num = max(num, self.open.innermost(item))
+        if num == -1:
+            return False
+        autoclose = self.copy_pos()
+        for i in range(len(in_progress)-1, num, -1):
+            node = in_progress[i][0]
+            self.msg(
+                self.__module__, 'W100',
+                node.node_position,
+                (node.name, Position(autoclose))
+            )
+            del in_progress[i]
+        del in_progress[num]
+        return True
+
+    def _current(self):
+        """Return the innermost element in progress or the document.
+        """
+        if self._in_progress:
+            return self._in_progress[-1][0]
+        return self.doc
+
+    def _start(self, crt, tokens, first, last, end):
+        """Create the element of a `start` token and return the node
+        which receives the next nodes. This follows
+        `ElementNP.make_node`. """
+        text = self.text
+        element = self['ElementNP']
+        start = self.caret
+        name = text[first:last].lower()
+        if self._close('start', name):
+            while self._close('start', name):
+                pass
+            crt = self._current()
+        if name in ELEMENT.VOID_ELEMENT:
+            kind = 0
+        elif name in ELEMENT.RAWTEXT_ELEMENT:
+            kind = 1
+        else:
+            kind = 2
+        node = element.classes[kind](name)
+        if kind == 2:
+            node.has_element_ = False
+        crt.has_element_ = True
+        self.update(last)
+        if text[last] not in '>/':
+            if element.lazy:
+                node.lazy_ = (element.get_reader(self), last, end-1)
+            else:
+                element.read_attributes(self, node, end-1, name)
+        crt.append_child(node)
+        if kind == 0:
+            return crt
+        if kind == 1:
+            _, _, stop, first, last = next(tokens)
+            if stop == self.end:
+                if self.messages.accept(element, 'E110'):
+                    element.msg('E110', self.lines.position(start), [name])
+            else:
+                next(tokens)
+            if element.spans:
+                SPANS.set_span(self, node, first, last)
+            else:
+                node.data = text[first:last]
+            return crt
+        node.pos = self.lines.locate(start)
+        self._in_progress.append((node, element))
+        return node
+
+    def _end(self, crt, start, end, first, last):
+        """Close the element of an `end` token and return the node
+        which receives the next nodes. """
+        if self._close('end', self.text[first:last].lower()):
+            return self._current()
+        entity = self['EntityNP']
+        if self.messages.accept(entity, 'E101'):
+            entity.msg('E101', self.pos, [self.text[start:end]])
+        return crt
+
+    def _stray(self, start):
+        """Return the `Entity` of a stray `<` or `&`. """
+        if self.text[start] == '&':
+            char, node = '&', Entity('&amp;')
+        else:
+            # Reports a start tag discarded because of a `<`.
+            self['ElementNP'].is_element(self)
+            char, node = '<', Entity('&lt;')
+        entity = self['EntityNP']
+        if self.messages.accept(entity, 'E100'):
+            entity.msg('E100', self.pos, [char])
+        return node
+
+    def _character_data(self, kind, start, end, first, last):
+        """Return the node of a comment, cdata, doctype or processing
+        instruction token. """
+        # pylint: disable=protected-access,too-many-arguments
+        text = self.text
+        closed = end != self.end or last != end
+        if kind == 'comment':
+            comment = self['CommentNP']
+            if text.startswith('<!--', start):
+                node = comment._make_comment(self, first, last, closed)
+                if not closed and self.messages.accept(comment, 'E200'):
+                    comment.msg('E200', self.pos)
+                return node
+            if self.messages.accept(comment, 'E100'):
+                comment.msg('E100', self.pos)
+            if closed:
+                if self.messages.accept(comment, 'E300'):
+                    comment.msg('E300', self.lines.position(last))
+            else:
+                self.update(end)
+                if self.messages.accept(comment, 'E201'):
+                    comment.msg('E201', self.pos)
+            return Comment(text[first:last].replace('--', '- '))
+        if kind == 'pi':
+            processor = self['ProcessingInstructionNP']
+            target = text[start+1:first-1]
+            if not closed and self.messages.accept(processor, 'E101'):
+                processor.msg('E101', self.pos, [target])
+            return SPANS.make(self, ProcessingInstruction, first, last,
+                              target)
+        cls, processor = CData, self['CDataNP']
+        if kind == 'doctype':
+            cls, processor = DocumentType, self['DocumentTypeNP']
+        if not closed and self.messages.accept(processor, 'E100'):
+            processor.msg('E100', self.pos)
+        return SPANS.make(self, cls, first, last)